@@ -8,6 +8,12 @@ import matplotlib.gridspec as gridspec
 from statistics import mean
 import numpy as np
 import math
+import functools
+import os
+import json
+import hashlib
+import contextvars
+from concurrent.futures import ProcessPoolExecutor
 
 def read_lasio(file_path):
     las = lasio.read(file_path)
@@ -27,6 +33,370 @@ def read_lasio(file_path):
     return df_las, curve_data
 
 
+# Rows parsed per chunk of the ~A section, and bytes read per block of a file
+LAS_CHUNK_ROWS = 65536
+LAS_READ_BYTES = 4 * 1024**2
+
+
+def las_header_line(line):
+    # "MNEM.UNIT  VALUE : DESCRIPTION" -> (mnemonic, unit, value, description)
+    mnemonic, rest = line.split(".", 1)
+    unit = rest.split(None, 1)[0] if rest[:1].strip() else ""
+    value, description = rest[len(unit) :], ""
+    if ":" in value:
+        value, _, description = value.rpartition(":")
+
+    return mnemonic.strip(), unit, value.strip(), description.strip()
+
+
+class LasStreamParser:
+    """
+    Incremental parser for unwrapped LAS 2.0 files.
+
+    Bytes are fed as they arrive, in blocks of any size. Header lines are
+    parsed one by one; once the ~A section starts, data lines are parsed every
+    `chunk_rows` lines straight into one preallocated float array, sized from
+    STRT/STOP/STEP and grown if the file has more rows. NULL values become NaN
+    chunk by chunk, so peak memory stays close to the final frame.
+
+    feed() and close() raise ValueError for files this parser does not handle
+    (wrapped data, other LAS versions, duplicate or text curves).
+    """
+
+    def __init__(self, chunk_rows=LAS_CHUNK_ROWS):
+        self.chunk_rows = chunk_rows
+        self.tail = b""
+        self.section = None
+        self.version = {}
+        self.well = {}
+        self.curves = []
+        self.pending = []
+        self.data = None
+        self.rows = 0
+
+    def feed(self, block: bytes):
+        lines = (self.tail + block).split(b"\n")
+        self.tail = lines.pop()
+
+        if self.data is None:
+            lines = self.header(lines)
+
+        self.pending.extend(lines)
+        if len(self.pending) >= self.chunk_rows:
+            self.parse()
+
+    def header(self, lines):
+        # Parses header lines up to ~A and returns the data lines after it
+        for i, raw in enumerate(lines):
+            line = raw.decode("utf-8", errors="replace").strip()
+            if not line or line.startswith("#"):
+                continue
+
+            if line.startswith("~"):
+                self.section = line[1:2].upper()
+                if self.section == "A":
+                    self.start()
+                    return lines[i + 1 :]
+                continue
+
+            if self.section in ("V", "W", "C"):
+                mnemonic, unit, value, _ = las_header_line(line)
+                if self.section == "V":
+                    self.version[mnemonic.upper()] = value
+                elif self.section == "W":
+                    self.well[mnemonic.upper()] = value
+                else:
+                    self.curves.append((mnemonic, unit))
+
+        return []
+
+    def start(self):
+        if not self.version.get("VERS", "").startswith("2"):
+            raise ValueError(f"Unsupported LAS version: {self.version.get('VERS')}")
+        if self.version.get("WRAP", "NO").upper() != "NO":
+            raise ValueError("Wrapped LAS files are not streamed")
+        if "WELL" not in self.well or not self.curves:
+            raise ValueError("Missing WELL or curve definitions")
+
+        names = [mnemonic for mnemonic, _ in self.curves]
+        if len(set(names)) != len(names):
+            raise ValueError("Duplicate curve mnemonics")
+
+        self.null = float(self.well["NULL"]) if self.well.get("NULL") else None
+
+        try:
+            start, stop, step = (float(self.well[key]) for key in ("STRT", "STOP", "STEP"))
+            capacity = int(round(abs((stop - start) / step))) + 1
+        except (KeyError, ValueError, ZeroDivisionError, OverflowError):
+            capacity = self.chunk_rows
+
+        self.data = np.empty((max(capacity, 1), len(self.curves)), dtype=float)
+
+    def parse(self):
+        columns = len(self.curves)
+        lines = [
+            line
+            for line in self.pending
+            if line.strip() and not line.lstrip().startswith(b"#")
+        ]
+        self.pending = []
+
+        # numpy's own text parser, without a Python object per value
+        values = np.fromstring(b" ".join(lines).decode("ascii"), sep=" ")
+        if values.size != len(lines) * columns:
+            raise ValueError("Data lines do not match the curve definitions")
+
+        values = values.reshape(-1, columns)
+        if self.null is not None:
+            values[values == self.null] = np.nan
+
+        if self.rows + len(values) > len(self.data):
+            self.data.resize(
+                (max(2 * len(self.data), self.rows + len(values)), columns),
+                refcheck=False,
+            )
+
+        self.data[self.rows : self.rows + len(values)] = values
+        self.rows += len(values)
+
+    def close(self):
+        """
+        Parse what is left and return (df_las, curve_data) like read_lasio.
+        """
+        self.feed(b"\n")
+        if self.data is None:
+            raise ValueError("No ~A section")
+        self.parse()
+
+        # Drops the unused tail of the estimate in place, without a second copy
+        self.data.resize((self.rows, len(self.curves)), refcheck=False)
+
+        df_las = pd.DataFrame(
+            self.data, columns=[mnemonic for mnemonic, _ in self.curves], copy=False
+        )
+        df_las.insert(0, "WELL", self.well["WELL"])
+
+        df_las, reverse_mapping = rename_columns(df_las)
+
+        curve_data = {
+            reverse_mapping.get(mnemonic, mnemonic): unit for mnemonic, unit in self.curves
+        }
+
+        return df_las, curve_data
+
+
+def read_las_streaming(file_path, chunk_rows=LAS_CHUNK_ROWS):
+    """
+    Read an unwrapped LAS 2.0 file through LasStreamParser.
+
+    Parameters:
+    - file_path: path of the LAS file.
+    - chunk_rows: data lines parsed per chunk.
+
+    Returns:
+    - (df_las, curve_data) like read_lasio.
+    """
+    parser = LasStreamParser(chunk_rows)
+
+    with open(file_path, "rb") as f:
+        for block in iter(functools.partial(f.read, LAS_READ_BYTES), b""):
+            parser.feed(block)
+
+    return parser.close()
+
+
+def read_las(file_path):
+    # Streams the common unwrapped LAS 2.0 files, lasio reads everything else
+    try:
+        return read_las_streaming(file_path)
+    except ValueError:
+        return read_lasio(file_path)
+
+
+# Header fields reported by scan_las_header as the well's location
+LAS_LOCATION_FIELDS = [
+    "UWI",
+    "API",
+    "COMP",
+    "FLD",
+    "LOC",
+    "PROV",
+    "STAT",
+    "CNTY",
+    "CTRY",
+    "LATI",
+    "LONG",
+    "X",
+    "Y",
+    "XWELL",
+    "YWELL",
+]
+
+# ~W fields LAS 1.x keeps in the value slot; the others hold a label there
+# and their value in the description, as lasio reads them
+LAS1_VALUE_FIELDS = ("STRT", "STOP", "STEP", "NULL")
+
+# Files scanned per task of scan_las_directory, and header size given up at
+LAS_SCAN_BATCH = 256
+LAS_HEADER_BYTES = 4 * 1024**2
+
+
+def las_float(value):
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def scan_las_header(file_path, aliases=None):
+    """
+    Read the headers of a LAS file, stopping at ~A.
+
+    Parameters:
+    - file_path: path of the LAS file.
+    - aliases: rename_columns' mnemonic mapping, when scanning many files.
+
+    Returns:
+    - dict with the well name, version, wrap, depth range, step and its unit,
+      NULL value, location fields found in ~W or ~P, and the curves as
+      mnemonic, unit and the alias rename_columns maps them to. "error" holds
+      the reason a file could not be scanned.
+    """
+    header = {"V": {}, "W": {}, "P": {}, "C": []}
+    section = None
+    size = 0
+
+    try:
+        with open(file_path, "rb") as f:
+            for raw in f:
+                size += len(raw)
+                if size > LAS_HEADER_BYTES:
+                    raise ValueError("No ~A section in the first bytes")
+
+                line = raw.decode("utf-8", errors="replace").strip()
+                if not line or line.startswith("#"):
+                    continue
+
+                if line.startswith("~"):
+                    section = line[1:2].upper()
+                    if section == "A":
+                        break
+                    continue
+
+                if section in header and "." in line:
+                    mnemonic, unit, value, description = las_header_line(line)
+                    if section == "C":
+                        header["C"].append((mnemonic, unit))
+                    else:
+                        header[section][mnemonic.upper()] = (unit, value, description)
+            else:
+                raise ValueError("No ~A section")
+    except (OSError, ValueError) as e:
+        return {"path": file_path, "error": str(e)}
+
+    version = header["V"].get("VERS", ("", "", ""))[1]
+    if aliases is None:
+        _, aliases = rename_columns(pd.DataFrame())
+
+    def field(mnemonic, sections="W"):
+        for section in sections:
+            if mnemonic in header[section]:
+                _, value, description = header[section][mnemonic]
+                if section == "W" and version.startswith("1") and mnemonic not in LAS1_VALUE_FIELDS:
+                    return description
+                return value
+        return None
+
+    return {
+        "path": file_path,
+        "well": field("WELL"),
+        "version": version,
+        "wrap": field("WRAP", "V"),
+        "start": las_float(field("STRT")),
+        "stop": las_float(field("STOP")),
+        "step": las_float(field("STEP")),
+        "depth_unit": header["W"].get("STRT", ("",))[0],
+        "null": las_float(field("NULL")),
+        "location": {
+            mnemonic: field(mnemonic, "WP")
+            for mnemonic in LAS_LOCATION_FIELDS
+            if field(mnemonic, "WP")
+        },
+        "curves": [
+            {"mnemonic": mnemonic, "alias": aliases.get(mnemonic, mnemonic), "unit": unit}
+            for mnemonic, unit in header["C"]
+        ],
+        "error": None,
+    }
+
+
+def scan_las_files(paths):
+    # One task of scan_las_directory, so each process call covers many files
+    _, aliases = rename_columns(pd.DataFrame())
+    return [scan_las_header(path, aliases) for path in paths]
+
+
+def scan_las_directory(directory, workers=None, progress=None):
+    """
+    Inventory every LAS file under a directory from its headers alone.
+
+    Parameters:
+    - directory: directory searched recursively for *.las files.
+    - workers: process count. None uses os.cpu_count(); 1 never starts a pool.
+    - progress: optional callable receiving the scanned fraction after each
+      batch of LAS_SCAN_BATCH files.
+
+    Returns:
+    - DataFrame with one scan_las_header row per file, sorted by path.
+    """
+    paths = sorted(
+        os.path.join(root, name)
+        for root, _, names in os.walk(directory)
+        for name in names
+        if name.lower().endswith(".las")
+    )
+    batches = [paths[i : i + LAS_SCAN_BATCH] for i in range(0, len(paths), LAS_SCAN_BATCH)]
+
+    if workers is None:
+        workers = os.cpu_count() or 1
+    workers = max(1, min(workers, len(batches)))
+
+    rows = []
+    if workers == 1:
+        for batch in batches:
+            rows.extend(scan_las_files(batch))
+            if progress is not None:
+                progress(len(rows) / len(paths))
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            futures = [pool.submit(scan_las_files, batch) for batch in batches]
+            try:
+                for future in futures:
+                    rows.extend(future.result())
+                    if progress is not None:
+                        progress(len(rows) / len(paths))
+            except BaseException:
+                for future in futures:
+                    future.cancel()
+                raise
+
+    columns = [
+        "path",
+        "well",
+        "version",
+        "wrap",
+        "start",
+        "stop",
+        "step",
+        "depth_unit",
+        "null",
+        "location",
+        "curves",
+        "error",
+    ]
+    return pd.DataFrame(rows, columns=columns)
+
+
 def rename_columns(df):
     value_mapping = {
         "RDEEP": [
@@ -111,6 +481,195 @@ def rename_columns(df):
     return df, reverse_mapping
 
 
+# Statistics store of the well a request works on, bound by bind_curve_stats
+CURVE_STATS = contextvars.ContextVar("curve_stats", default=None)
+
+# Curve pairs whose correlation the VCL models use for default endpoints
+MODEL_CORRELATIONS = [("GR", "SP"), ("NPHI", "RHOB")]
+
+
+def curve_fingerprint(values):
+    # Content hash of a curve; non-numeric columns (WELL) hash their text
+    values = np.asarray(values)
+    if values.dtype.kind in "biuf":
+        values = np.ascontiguousarray(values, dtype=float)
+    else:
+        values = pd.util.hash_array(values.astype(object))
+
+    return hashlib.blake2b(values.view(np.uint8), digest_size=16).hexdigest()
+
+
+def column_identity(series):
+    """
+    Where a column's values live, without reading them.
+
+    Two columns with the same identity are views of the same buffer, so a
+    column a shallow copy left alone is recognized as unchanged. Only
+    meaningful while the column compared against is still alive.
+    """
+    values = series.array
+    if hasattr(values, "__arrow_array__"):
+        chunked = values.__arrow_array__()
+        return (
+            len(chunked),
+            tuple(
+                buffer.address if buffer is not None else None
+                for chunk in chunked.chunks
+                for buffer in chunk.buffers()
+            ),
+        )
+
+    values = series.to_numpy()
+    return (
+        values.__array_interface__["data"][0],
+        values.shape,
+        values.strides,
+        values.dtype.str,
+    )
+
+
+def new_curve_stats():
+    # Per curve (version, statistics), per curve pair (versions, correlation)
+    return {"curves": {}, "correlations": {}}
+
+
+def bind_curve_stats(df, versions, store):
+    """
+    Serve the statistics of df's curves from store for the rest of the context.
+
+    Parameters:
+    - df: the well's frame as loaded. Only curves still held in its buffers
+      are looked up, so a curve recomputed since is never taken for it.
+    - versions: curve name to its version in df, changed whenever it is.
+    - store: new_curve_stats dict kept with the well. Statistics computed
+      for a curve are added to it under the curve's version.
+    """
+    CURVE_STATS.set(
+        {
+            "curves": {
+                # The array keeps the buffer the identity refers to alive
+                col: (column_identity(df[col]), versions[col], df[col].to_numpy())
+                for col in df.columns
+                if col in versions and pd.api.types.is_numeric_dtype(df[col])
+            },
+            "store": store,
+        }
+    )
+
+
+def bound_version(df, col):
+    # Version of df[col] if it is a curve of the bound frame, else None
+    bound = CURVE_STATS.get()
+    if bound is None or col not in bound["curves"]:
+        return None
+
+    identity, version, _ = bound["curves"][col]
+    return version if column_identity(df[col]) == identity else None
+
+
+def compute_curve_statistics(values, bins=50):
+    values = np.asarray(values, dtype=float)
+    present = values[~np.isnan(values)]
+    finite = present[np.isfinite(present)]
+
+    stats = {
+        "min": np.nan,
+        "max": np.nan,
+        "mean": np.nan,
+        "nan_count": int(len(values) - len(present)),
+        "p5": np.nan,
+        "p50": np.nan,
+        "p95": np.nan,
+        "histogram": {"counts": np.zeros(0, dtype=np.int64), "edges": np.zeros(0)},
+    }
+
+    if len(present):
+        stats["min"], stats["max"] = present.min(), present.max()
+        stats["mean"] = present.mean()
+    if len(finite):
+        stats["p5"], stats["p50"], stats["p95"] = np.percentile(finite, [5, 50, 95])
+        counts, edges = np.histogram(finite, bins=bins)
+        stats["histogram"] = {"counts": counts, "edges": edges}
+
+    return stats
+
+
+def curve_statistics(df, col):
+    """
+    Min, max, mean, NaN count, P5/P50/P95 and a histogram of one curve.
+
+    For a curve of the frame bound by bind_curve_stats, the statistics are
+    computed once per version of the curve and then read from the store.
+    """
+    version = bound_version(df, col)
+    if version is None:
+        return compute_curve_statistics(df[col].to_numpy(dtype=float))
+
+    store = CURVE_STATS.get()["store"]["curves"]
+    entry = store.get(col)
+
+    if entry is None or entry[0] != version:
+        entry = (version, compute_curve_statistics(df[col].to_numpy(dtype=float)))
+        store[col] = entry
+
+    return entry[1]
+
+
+def curve_stat(df, col, stat):
+    # Unbound curves get min, max and mean from one reduction, not every statistic
+    if stat in ("min", "max", "mean") and bound_version(df, col) is None:
+        values = df[col].to_numpy(dtype=float)
+        present = values[~np.isnan(values)]
+        return getattr(present, stat)() if len(present) else np.nan
+
+    return curve_statistics(df, col)[stat]
+
+
+def curve_correlation(df, col1, col2):
+    # Pearson correlation over samples present in both curves (as Series.corr)
+    def compute():
+        x = df[col1].to_numpy(dtype=float)
+        y = df[col2].to_numpy(dtype=float)
+        both = ~np.isnan(x) & ~np.isnan(y)
+        if both.sum() < 2:
+            return np.nan
+        with np.errstate(invalid="ignore", divide="ignore"):
+            return float(np.corrcoef(x[both], y[both])[0, 1])
+
+    versions = (bound_version(df, col1), bound_version(df, col2))
+    if None in versions:
+        return compute()
+
+    store = CURVE_STATS.get()["store"]["correlations"]
+    entry = store.get((col1, col2))
+
+    if entry is None or entry[0] != versions:
+        entry = (versions, compute())
+        store[(col1, col2)] = entry
+
+    return entry[1]
+
+
+def well_statistics(df):
+    """
+    Statistics of every numeric curve of a well in one go.
+
+    Returns:
+    - stats: dict with 'curves' (curve name to curve_statistics) and
+      'correlations' ("A:B" to curve_correlation) for MODEL_CORRELATIONS.
+    """
+    numeric = [col for col in df.columns if pd.api.types.is_numeric_dtype(df[col])]
+
+    return {
+        "curves": {col: curve_statistics(df, col) for col in numeric},
+        "correlations": {
+            f"{col1}:{col2}": curve_correlation(df, col1, col2)
+            for col1, col2 in MODEL_CORRELATIONS
+            if col1 in numeric and col2 in numeric
+        },
+    }
+
+
 def boxplot(data, curve_data):
     columns_to_plot = list(curve_data.keys())
     column_units = list(curve_data.values())
@@ -547,7 +1106,28 @@ def vclnd(
     return vclnd
 
 
-def calc_vcl(
+def rt_column(df):
+    # Deep resistivity curve used by the VCL and SW models (RT takes precedence)
+    if "RT" in df.columns:
+        return "RT"
+    elif "RDEEP" in df.columns:
+        return "RDEEP"
+
+    return None
+
+
+def vclgr_corrections(igr):
+    # Every GR correction evaluated on a whole IGR array at once
+    with np.errstate(invalid="ignore", divide="ignore", over="ignore"):
+        return {
+            "young": 0.083 * (np.exp2(3.7 * igr) - 1),
+            "older": 0.33 * (np.exp2(2 * igr) - 1),
+            "clavier": 1.7 - np.sqrt(3.38 - (igr + 0.7) ** 2),
+            "steiber": 0.5 * igr / (1.5 - igr),
+        }
+
+
+def vcl_arrays(
     df,
     gr_clean=None,
     gr_clay=None,
@@ -562,39 +1142,132 @@ def calc_vcl(
     neut_clay=None,
     den_clay=None,
     correction_gr="young",
+    models=("gr", "sp", "rt", "nd"),
 ):
-    if "GR" in df.columns:
-        df["VCLGR"] = df.apply(
-            lambda row: vclgr(
-                df, row, gr_clean=gr_clean, gr_clay=gr_clay, correction=correction_gr
-            ),
-            axis=1,
-        )
+    """
+    Whole-column equivalent of vclgr, vclsp, vclrt and vclnd.
+
+    Default endpoints are resolved once per call instead of once per row, so the
+    cost is a handful of array passes regardless of the number of depth samples.
+    Only the requested models (named as in select_vcl) are computed.
+
+    Returns:
+    - vcl: dict of curve name to numpy array. Holds VCLGR, VCLSP, VCLRT and VCLND
+      (for the requested models whose curves are available in df), with VCLGR
+      every GR correction as VCLGR_young, VCLGR_older, VCLGR_clavier,
+      VCLGR_steiber and VCLGR_linear.
+    """
+    vcl = {}
+
+    with np.errstate(invalid="ignore", divide="ignore", over="ignore"):
+        if "GR" in df.columns and "gr" in models:
+            gr = df["GR"].to_numpy(dtype=float)
+
+            if gr_clean is None or gr_clay is None:
+                gr_clean = curve_stat(df, "GR", "min")
+                gr_clay = curve_stat(df, "GR", "max")
+
+            igr = (gr - gr_clean) / (gr_clay - gr_clean)
+            corrections = vclgr_corrections(igr)
+
+            for name, values in corrections.items():
+                vcl[f"VCLGR_{name}"] = values
+            vcl["VCLGR_linear"] = igr
+            vcl["VCLGR"] = corrections.get(correction_gr, igr)
 
-        if "SP" in df.columns:
-            df["VCLSP"] = df.apply(
-                lambda row: vclsp(df, row, sp_clean=sp_clean, sp_clay=sp_clay), axis=1
+        # SP endpoints follow its correlation with GR, so it needs GR too
+        if "GR" in df.columns and "SP" in df.columns and "sp" in models:
+            sp = df["SP"].to_numpy(dtype=float)
+
+            if sp_clean is None or sp_clay is None:
+                if curve_correlation(df, "GR", "SP") > 0:
+                    sp_clean = curve_stat(df, "SP", "min")
+                    sp_clay = curve_stat(df, "SP", "max")
+                else:
+                    sp_clean = curve_stat(df, "SP", "max")
+                    sp_clay = curve_stat(df, "SP", "min")
+
+            vcl["VCLSP"] = (sp - sp_clean) / (sp_clay - sp_clean)
+
+        rt_col = rt_column(df)
+        if rt_col is not None and "rt" in models:
+            rt = df[rt_col].to_numpy(dtype=float)
+
+            if rt_clean is None or rt_clay is None:
+                rt_clean = curve_stat(df, rt_col, "min")
+                rt_clay = curve_stat(df, rt_col, "max")
+
+            vrt = (rt_clay / rt) * (rt_clean - rt) / (rt_clean - rt_clay)
+            vcl["VCLRT"] = np.where(
+                rt > 2 * rt_clay, 0.5 * (2 * vrt) ** (0.67 * (vrt + 1)), vrt
             )
 
-    if ("RT" in df.columns) or ("RDEEP" in df.columns):
-        df["VCLRT"] = df.apply(
-            lambda row: vclrt(df, row, rt_clean=rt_clean, rt_clay=rt_clay), axis=1
-        )
+        if ("NPHI" in df.columns) and ("RHOB" in df.columns) and "nd" in models:
+            neut = df["NPHI"].to_numpy(dtype=float)
+            den = df["RHOB"].to_numpy(dtype=float)
+
+            if neut_clean1 is None:
+                neut_clean1 = curve_stat(df, "NPHI", "min")
+            if den_clean1 is None:
+                den_clean1 = curve_stat(df, "RHOB", "max")
+            if neut_clean2 is None:
+                neut_clean2 = curve_stat(df, "NPHI", "max")
+            if den_clean2 is None:
+                den_clean2 = curve_stat(df, "RHOB", "min")
+            if neut_clay is None:
+                neut_clay = curve_stat(df, "NPHI", "max")
+            if den_clay is None:
+                den_clay = curve_stat(df, "RHOB", "max")
+
+            term1 = (den_clean2 - den_clean1) * (neut - neut_clean1) - (
+                den - den_clean1
+            ) * (neut_clean2 - neut_clean1)
+            term2 = (den_clean2 - den_clean1) * (neut_clay - neut_clean1) - (
+                den_clay - den_clean1
+            ) * (neut_clean2 - neut_clean1)
+            vcl["VCLND"] = term1 / term2
+
+    return vcl
 
-    if ("NPHI" in df.columns) and ("RHOB" in df.columns):
-        df["VCLND"] = df.apply(
-            lambda row: vclnd(
-                df,
-                row,
-                neut_clean1=neut_clean1,
-                den_clean1=den_clean1,
-                neut_clean2=neut_clean2,
-                den_clean2=den_clean2,
-                neut_clay=neut_clay,
-                den_clay=den_clay,
-            ),
-            axis=1,
-        )
+
+def calc_vcl(
+    df,
+    gr_clean=None,
+    gr_clay=None,
+    sp_clean=None,
+    sp_clay=None,
+    rt_clean=None,
+    rt_clay=None,
+    neut_clean1=None,
+    den_clean1=None,
+    neut_clean2=None,
+    den_clean2=None,
+    neut_clay=None,
+    den_clay=None,
+    correction_gr="young",
+    models=("gr", "sp", "rt", "nd"),
+):
+    vcl = vcl_arrays(
+        df,
+        gr_clean=gr_clean,
+        gr_clay=gr_clay,
+        sp_clean=sp_clean,
+        sp_clay=sp_clay,
+        rt_clean=rt_clean,
+        rt_clay=rt_clay,
+        neut_clean1=neut_clean1,
+        den_clean1=den_clean1,
+        neut_clean2=neut_clean2,
+        den_clean2=den_clean2,
+        neut_clay=neut_clay,
+        den_clay=den_clay,
+        correction_gr=correction_gr,
+        models=models,
+    )
+
+    for col in ["VCLGR", "VCLSP", "VCLRT", "VCLND"]:
+        if col in vcl:
+            df[col] = vcl[col]
 
     return df
 
@@ -917,7 +1590,7 @@ def phixnd_gas_corr(phin, phid):
     return phixnd_gas_corr
 
 
-def calc_phi(
+def phi_arrays(
     df,
     dt_ma=None,
     dt_fl=None,
@@ -928,49 +1601,127 @@ def calc_phi(
     neut_sh=None,
     cp=1,
     alpha=0.67,
+    vcl=None,
+    curves=None,
 ):
-    if "DTC" in df.columns:
-        df["PHISw"] = df.apply(
-            lambda row: phis_w(df, row, dt_ma=dt_ma, dt_fl=dt_fl, cp=cp),
-            axis=1,
-        )
-        df["PHISwshc"] = df.apply(
-            lambda row: phis_w_sh_corr(
-                df, row, dt_sh=dt_sh, dt_ma=dt_ma, dt_fl=dt_fl, cp=1
-            ),
-            axis=1,
-        )
+    """
+    Whole-column equivalent of the sonic, density and neutron porosity functions.
 
-        df["PHISrhg"] = df.apply(
-            lambda row: phis_rhg(df, row, dt_ma=dt_ma, alpha=alpha),
-            axis=1,
-        )
-        df["PHISrhgshc"] = df.apply(
-            lambda row: phis_rhg_sh_corr(
-                df, row, dt_sh=dt_sh, dt_ma=dt_ma, dt_fl=dt_fl, alpha=alpha
-            ),
-            axis=1,
-        )
+    The matrix, fluid and shale terms are resolved once per call and every
+    porosity curve is built from them with array arithmetic. vcl overrides the
+    df VCL curve for the shale corrections (it may carry extra leading axes);
+    the VCL curve is only read when a shale corrected curve is requested.
 
-    if "RHOB" in df.columns:
-        df["PHID"] = df.apply(
-            lambda row: phid(df, row, den_ma=den_ma, den_fl=den_fl),
-            axis=1,
-        )
-        df["PHIDshc"] = df.apply(
-            lambda row: phid_sh_corr(
-                df, row, den_ma=den_ma, den_fl=den_fl, den_sh=den_sh
-            ),
-            axis=1,
-        )
+    Returns:
+    - phi: dict of curve name to numpy array with PHISw, PHISwshc, PHISrhg,
+      PHISrhgshc, PHID, PHIDshc, PHINshc, PHIxND and the gas crossover
+      corrected PHIxNDgc (those in curves, all if None, for the curves
+      available in df).
+    """
+    curves = set(PHI_COLUMNS.values()) if curves is None else set(curves)
+    needed = set(curves)
+    if needed & {"PHIxND", "PHIxNDgc"}:
+        needed |= {"PHINshc", "PHIDshc"}
+
+    phi = {}
+
+    shale_corrected = {"PHISwshc", "PHISrhgshc", "PHIDshc", "PHINshc"}
+    if vcl is None and needed & shale_corrected:
+        vcl = df["VCL"].to_numpy(dtype=float)
+
+    with np.errstate(invalid="ignore", divide="ignore"):
+        if "DTC" in df.columns and needed & {
+            "PHISw",
+            "PHISwshc",
+            "PHISrhg",
+            "PHISrhgshc",
+        }:
+            dt = df["DTC"].to_numpy(dtype=float)
+            dt_min = curve_stat(df, "DTC", "min")
+            dt_max = curve_stat(df, "DTC", "max")
+
+            dt_ma = dt_min if dt_ma is None else dt_ma
+            dt_fl = dt_max if dt_fl is None else dt_fl
+            dt_sh = dt_min if dt_sh is None else dt_sh
+
+            phis_wyllie = (dt - dt_ma) / (dt_fl - dt_ma)
+            phis_rhg = alpha * (dt - dt_ma) / dt
+            phis_sh = (dt_sh - dt_ma) / (dt_fl - dt_ma)
+
+            if "PHISw" in needed:
+                phi["PHISw"] = (1 / cp) * phis_wyllie
+            if "PHISwshc" in needed:
+                # Shale corrected Wyllie always uses cp=1
+                phi["PHISwshc"] = phis_wyllie - vcl * phis_sh
+            if "PHISrhg" in needed:
+                phi["PHISrhg"] = phis_rhg
+            if "PHISrhgshc" in needed:
+                phi["PHISrhgshc"] = phis_rhg - vcl * phis_sh
+
+        if "RHOB" in df.columns and needed & {"PHID", "PHIDshc"}:
+            den = df["RHOB"].to_numpy(dtype=float)
+            den_min = curve_stat(df, "RHOB", "min")
+            den_max = curve_stat(df, "RHOB", "max")
+
+            den_ma = den_max if den_ma is None else den_ma
+            den_fl = den_min if den_fl is None else den_fl
+            den_sh = den_max if den_sh is None else den_sh
+
+            phi["PHID"] = (den - den_ma) / (den_fl - den_ma)
+            if "PHIDshc" in needed:
+                phi["PHIDshc"] = phi["PHID"] - vcl * (den_sh - den_ma) / (
+                    den_fl - den_ma
+                )
 
-    if "NPHI" in df.columns:
-        df["PHINshc"] = df.apply(
-            lambda row: phin_sh_corr(df, row, neut_sh=neut_sh),
-            axis=1,
-        )
-        if "RHOB" in df.columns:
-            df["PHIxND"] = phixnd(df["PHINshc"], df["PHIDshc"])
+        if "NPHI" in df.columns and "PHINshc" in needed:
+            neut = df["NPHI"].to_numpy(dtype=float)
+
+            if neut_sh is None:
+                neut_sh = curve_stat(df, "NPHI", "max")
+
+            phi["PHINshc"] = neut - vcl * neut_sh
+
+            if "RHOB" in df.columns and needed & {"PHIxND", "PHIxNDgc"}:
+                phin, phid = phi["PHINshc"], phi["PHIDshc"]
+
+                phi["PHIxND"] = phixnd(phin, phid)
+                # Root mean square only where the neutron-density crossover flags gas
+                phi["PHIxNDgc"] = np.where(
+                    phin < phid, phixnd_gas_corr(phin, phid), phi["PHIxND"]
+                )
+
+    return {col: values for col, values in phi.items() if col in curves}
+
+
+def calc_phi(
+    df,
+    dt_ma=None,
+    dt_fl=None,
+    dt_sh=None,
+    den_ma=None,
+    den_fl=None,
+    den_sh=None,
+    neut_sh=None,
+    cp=1,
+    alpha=0.67,
+    curves=None,
+):
+    phi = phi_arrays(
+        df,
+        dt_ma=dt_ma,
+        dt_fl=dt_fl,
+        dt_sh=dt_sh,
+        den_ma=den_ma,
+        den_fl=den_fl,
+        den_sh=den_sh,
+        neut_sh=neut_sh,
+        cp=cp,
+        alpha=alpha,
+        curves=curves,
+    )
+
+    for col, values in phi.items():
+        df[col] = values
 
     return df
 
@@ -1031,6 +1782,13 @@ def select_phi(df, select_phi="neutron_density"):
         except KeyError:
             print("No PHIxND column found. Please check the column names.")
 
+            return df
+    elif select_phi == "neutron_density_gas_corr":
+        try:
+            df["PHIE"] = df["PHIxNDgc"]
+        except KeyError:
+            print("No PHIxNDgc column found. Please check the column names.")
+
             return df
 
     # df = df.drop(
@@ -1091,6 +1849,81 @@ def sw_waxman(
     return sw
 
 
+def sw_waxman_solve(
+    phie,
+    vcl,
+    rt,
+    mid_perf_md,
+    rw=0.08,
+    a=1,
+    m=2,
+    n=2,
+    mid_perf_bht=210,
+    surface_temp=60,
+    tol=0.01,
+    max_iter=100,
+):
+    """
+    Batched Waxman-Smits fixed-point solver.
+
+    Every depth sample is iterated together as an array, starting from the Archie
+    saturation. Samples whose update falls within tol are masked out of the next
+    iteration, and the loop stops after max_iter iterations at the latest.
+
+    Parameters:
+    - phie, vcl, rt: array-like porosity, clay volume and true resistivity.
+    - mid_perf_md: mid perforation depth used for the temperature gradient.
+    - rw, a, m, n: scalars, or arrays broadcasting against the curves (for example
+      shape (k, 1) to solve k parameter sets against (depth,) curves at once).
+    - tol: convergence tolerance on the change of SW between two iterations.
+    - max_iter: maximum number of iterations.
+
+    Returns:
+    - sw: numpy array of water saturation (NaN where the inputs are invalid).
+    - unconverged: number of samples still above tol after max_iter iterations.
+    """
+    phie = np.asarray(phie, dtype=float)
+    vcl = np.asarray(vcl, dtype=float)
+    rt = np.asarray(rt, dtype=float)
+
+    temp_grad = (mid_perf_bht - surface_temp) / np.asarray(mid_perf_md, dtype=float)
+
+    with np.errstate(invalid="ignore", divide="ignore", over="ignore"):
+        bmax = np.maximum(51.31 * np.log(temp_grad + 460) - 317.2, 0)
+        b = (1 - 0.83 / np.exp(0.5 / np.asarray(rw, dtype=float))) * bmax
+
+        qv = -47.619 * vcl**2.0 + 61.429 * vcl
+        f = a / (phie**m)
+        sw = (f * rw / rt) ** (1 / np.asarray(n, dtype=float))
+
+        # Parameters may be arrays too, so iterate on flat views of the common shape
+        shape = np.broadcast_shapes(sw.shape, np.shape(b * qv))
+        f = np.broadcast_to(f, shape).ravel()
+        rt = np.broadcast_to(rt, shape).ravel()
+        bqv = np.broadcast_to(b * qv, shape).ravel()
+        inv_n = np.broadcast_to(1 / np.asarray(n, dtype=float), shape).ravel()
+
+        sw = np.broadcast_to(sw, shape).flatten()
+        sw[~np.isfinite(sw)] = np.nan
+        active = np.flatnonzero(np.isfinite(sw))
+
+        for _ in range(max_iter):
+            if active.size == 0:
+                break
+
+            swi = sw[active]
+            rt_active = rt[active]
+            sw_new = (
+                f[active] / rt_active / (1 / rt_active + (bqv[active] / swi))
+            ) ** inv_n[active]
+            sw[active] = sw_new
+
+            # NaN updates compare False and drop out together with converged ones
+            active = active[np.abs(sw_new - swi) > tol]
+
+    return sw.reshape(shape), active.size
+
+
 def sw_indonesia(df, row, rw=0.08, a=1, m=2, n=2, rsh=None):
     phi_value = row["PHIE"]
     vcl_value = row["VCL"]
@@ -1124,60 +1957,729 @@ def sw_indonesia(df, row, rw=0.08, a=1, m=2, n=2, rsh=None):
     return sw_indonesia
 
 
-def calc_sw(
-    df,
+def nanmean_depth(values):
+    # Mean over the last (depth) axis ignoring NaN, without warnings on empty rows
+    present = ~np.isnan(values)
+    total = np.where(present, values, 0.0).sum(axis=-1, keepdims=True)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return total / present.sum(axis=-1, keepdims=True)
+
+
+def sw_models(
+    phie,
+    vcl,
+    rt,
+    rsh,
+    mid_perf_md,
     rw=0.08,
     a=1,
     m=2,
     n=2,
-    mid_perf_md=None,
     mid_perf_bht=210,
     surface_temp=60,
-    rsh=None,
+    waxman_tol=0.01,
+    waxman_max_iter=100,
+    models=("archie", "waxman", "indo"),
 ):
-    if ("RT" in df.columns) or ("RDEEP" in df.columns):
-        df["SWarchie"] = df.apply(
-            lambda row: sw_archie(df, row, rw=rw, a=a, m=m, n=n),
-            axis=1,
-        )
-        df["SWwaxman"] = df.apply(
-            lambda row: sw_waxman(
-                df,
-                row,
+    """
+    Array kernel behind sw_arrays.
+
+    Curves run along the last axis. rw, a, m, n may be arrays broadcasting against
+    the curves, in which case every leading index is an independent parameter set
+    and the Waxman rescaling uses that set's own Archie and Waxman means.
+    Samples with NaN, zero or negative porosity or resistivity give NaN.
+
+    Returns:
+    - sw: dict of SWarchie, SWwaxman and SWindonesia arrays for the requested
+      models (named as in select_sw).
+    - unconverged: number of samples where the Waxman-Smits solver hit
+      waxman_max_iter.
+    """
+    sw = {}
+    unconverged = 0
+
+    rt = np.asarray(rt, dtype=float)
+    phie = np.asarray(phie, dtype=float)
+    vcl = np.asarray(vcl, dtype=float)
+
+    with np.errstate(invalid="ignore", divide="ignore", over="ignore"):
+        phie = np.where((phie > 0) & (rt > 0), phie, np.nan)
+
+        if "archie" in models or "waxman" in models:
+            sw["SWarchie"] = ((a / (phie**m)) * rw / rt) ** (
+                1 / np.asarray(n, dtype=float)
+            )
+
+        if "waxman" in models:
+            sw["SWwaxman"], unconverged = sw_waxman_solve(
+                phie,
+                vcl,
+                rt,
+                mid_perf_md,
                 rw=rw,
                 a=a,
                 m=m,
                 n=n,
-                mid_perf_md=mid_perf_md,
                 mid_perf_bht=mid_perf_bht,
                 surface_temp=surface_temp,
-            ),
-            axis=1,
-        )
-        
-        print(type(df['SWwaxman'].iloc[0]))
-        
-        df["SWindonesia"] = df.apply(
-            lambda row: sw_indonesia(df, row, rw=rw, a=a, m=m, n=n, rsh=rsh),
-            axis=1,
-        )
+                tol=waxman_tol,
+                max_iter=waxman_max_iter,
+            )
+            sw["SWwaxman"] *= nanmean_depth(sw["SWarchie"]) / nanmean_depth(
+                sw["SWwaxman"]
+            )
 
-    if all(col in df.columns for col in ["SWarchie", "SWwaxman"]):
-        mean_archie = df["SWarchie"].mean()
-        mean_waxman = df["SWwaxman"].mean()
-        df["SWwaxman"] *= mean_archie / mean_waxman
-    else:
-        df.drop(columns=[col for col in ["SWarchie", "SWwaxman"] if col in df.columns], inplace=True)
+            if "archie" not in models:
+                del sw["SWarchie"]
+
+        if "indo" in models:
+            denominator = (vcl ** (1 - (0.5 * vcl))) / (rsh**0.5) + (
+                (phie**m) / (a * rw)
+            ) ** 0.5
+            sw["SWindonesia"] = np.where(
+                denominator > 0,
+                ((1 / rt) / denominator) ** (2 / np.asarray(n, dtype=float)),
+                np.nan,
+            )
 
-    return df
+    return sw, unconverged
 
 
-def select_sw(df, select_sw="archie"):
-    if select_sw == "archie":
-        try:
-            df["SW"] = df["SWarchie"]
-        except KeyError:
-            print("No SWarchie column found. Please check the column names.")
+def sw_arrays(
+    df,
+    rw=0.08,
+    a=1,
+    m=2,
+    n=2,
+    mid_perf_md=None,
+    mid_perf_bht=210,
+    surface_temp=60,
+    rsh=None,
+    waxman_tol=0.01,
+    waxman_max_iter=100,
+    models=("archie", "waxman", "indo"),
+):
+    """
+    Whole-column Archie, Waxman-Smits and Indonesia water saturation.
+
+    The resistivity curve, rsh and mid_perf_md are resolved once per call. Samples
+    with NaN, zero or negative porosity or resistivity give NaN for every model.
+    Only the requested models are computed; the VCL curve is read only by
+    Waxman-Smits and Indonesia.
+
+    Returns:
+    - sw: dict of curve name to numpy array with SWarchie, SWwaxman (rescaled to
+      the Archie mean) and SWindonesia for the requested models. Empty when df
+      has no RT/RDEEP curve.
+    - unconverged: number of samples where the Waxman-Smits solver hit
+      waxman_max_iter.
+    """
+    rt_col = rt_column(df)
+    if rt_col is None:
+        return {}, 0
+
+    if rsh is None and "indo" in models:
+        rsh = curve_stat(df, rt_col, "min")
+    if mid_perf_md is None and "waxman" in models:
+        mid_perf_md = curve_stat(df, "MD", "mean")
+
+    shaly = "waxman" in models or "indo" in models
+
+    return sw_models(
+        df["PHIE"].to_numpy(dtype=float),
+        df["VCL"].to_numpy(dtype=float) if shaly else np.nan,
+        df[rt_col].to_numpy(dtype=float),
+        rsh,
+        mid_perf_md,
+        rw=rw,
+        a=a,
+        m=m,
+        n=n,
+        mid_perf_bht=mid_perf_bht,
+        surface_temp=surface_temp,
+        waxman_tol=waxman_tol,
+        waxman_max_iter=waxman_max_iter,
+        models=models,
+    )
+
+
+def calc_sw(
+    df,
+    rw=0.08,
+    a=1,
+    m=2,
+    n=2,
+    mid_perf_md=None,
+    mid_perf_bht=210,
+    surface_temp=60,
+    rsh=None,
+    waxman_tol=0.01,
+    waxman_max_iter=100,
+    models=("archie", "waxman", "indo"),
+):
+    sw, unconverged = sw_arrays(
+        df,
+        rw=rw,
+        a=a,
+        m=m,
+        n=n,
+        mid_perf_md=mid_perf_md,
+        mid_perf_bht=mid_perf_bht,
+        surface_temp=surface_temp,
+        rsh=rsh,
+        waxman_tol=waxman_tol,
+        waxman_max_iter=waxman_max_iter,
+        models=models,
+    )
+
+    if sw:
+        for col, values in sw.items():
+            df[col] = values
+        if "waxman" in models:
+            df.attrs["SWwaxman_unconverged"] = unconverged
+    else:
+        stale = [SW_COLUMNS[model] for model in models]
+        df.drop(columns=[col for col in stale if col in df.columns], inplace=True)
+
+    return df
+
+
+VCL_COLUMNS = {"gr": "VCLGR", "sp": "VCLSP", "rt": "VCLRT", "nd": "VCLND"}
+
+PHI_COLUMNS = {
+    "wyllie": "PHISw",
+    "wyllie_sh_corr": "PHISwshc",
+    "rhg": "PHISrhg",
+    "rhg_sh_corr": "PHISrhgshc",
+    "density": "PHID",
+    "density_sh_corr": "PHIDshc",
+    "neutron_sh_corr": "PHINshc",
+    "neutron_density": "PHIxND",
+    "neutron_density_gas_corr": "PHIxNDgc",
+}
+
+SW_COLUMNS = {"archie": "SWarchie", "waxman": "SWwaxman", "indo": "SWindonesia"}
+
+PHI_PARAMETERS = [
+    "dt_ma",
+    "dt_fl",
+    "dt_sh",
+    "den_ma",
+    "den_fl",
+    "den_sh",
+    "neut_sh",
+    "cp",
+    "alpha",
+]
+SW_PARAMETERS = ["rw", "a", "m", "n", "rsh"]
+
+
+def parameter_grid(**values):
+    # Cartesian product of parameter value lists, flattened to one entry per set
+    names = list(values.keys())
+    grids = np.meshgrid(
+        *[np.atleast_1d(values[name]) for name in names], indexing="ij"
+    )
+
+    return {name: grid.ravel() for name, grid in zip(names, grids)}
+
+
+def parameter_sweep(
+    df,
+    params,
+    phi_select="neutron_density",
+    sw_select="archie",
+    sw_cutoff=0.8,
+    phi_cutoff=0.2,
+    vcl_cutoff=0.2,
+    depth_start=None,
+    depth_end=None,
+    mid_perf_md=None,
+    mid_perf_bht=210,
+    surface_temp=60,
+    return_curves=None,
+    max_chunk_bytes=64 * 2**20,
+    progress=None,
+    phi_defaults=None,
+):
+    """
+    Evaluate many porosity and saturation parameter sets against one well at once.
+
+    Every parameter set is a row of a (sets x depth) broadcast through phi_arrays
+    and sw_models, so calc_phi and calc_sw semantics are kept. Sets are processed
+    in chunks holding at most max_chunk_bytes per working array.
+
+    Parameters:
+    - df: DataFrame containing 'MD', 'VCL' and the raw curves (sorted by MD).
+      'PHIE' is not needed: the phi_select curve is used (recomputed when
+      porosity parameters are swept).
+    - params: dict of parameter name to array-like, all broadcast to one length.
+      Porosity names follow calc_phi (dt_ma, den_ma, cp, ...), saturation names
+      follow calc_sw (rw, a, m, n, rsh). Use parameter_grid for a full grid.
+    - phi_select, sw_select: porosity and saturation model (as select_phi/select_sw).
+    - sw_cutoff, phi_cutoff, vcl_cutoff: net pay cutoffs.
+    - depth_start, depth_end: optional zone (defaults to the whole well).
+    - return_curves: optional list of parameter set indices whose PHIE/SW curves
+      are returned.
+    - progress: optional callable receiving the completed fraction after each
+      chunk.
+    - phi_defaults: porosity parameters for the ones not swept when porosity is
+      recomputed, e.g. PIPELINE_DEFAULTS["phi_models"] to match the PHI step;
+      phi_arrays' own defaults otherwise.
+
+    Returns:
+    - sweep: dict with the broadcast 'params', and per set 'mean_sw' (zone mean),
+      'net_pay' (net pay thickness) and 'hcpv' (hydrocarbon pore thickness),
+      plus 'curves' mapping each requested index to its 'PHIE' and 'SW' arrays.
+    """
+    names = list(params.keys())
+    values = np.broadcast_arrays(
+        *[np.atleast_1d(np.asarray(params[name], dtype=float)) for name in names]
+    )
+    params = {name: value.ravel() for name, value in zip(names, values)}
+    sets = len(next(iter(params.values()))) if params else 1
+
+    unknown = set(params) - set(PHI_PARAMETERS) - set(SW_PARAMETERS)
+    if unknown:
+        raise ValueError(f"Unknown sweep parameters: {sorted(unknown)}")
+
+    md = df["MD"].to_numpy(dtype=float)
+    thickness = np.diff(depth_edges(md))
+
+    window = np.ones(len(md), dtype=bool)
+    if depth_start is not None:
+        window &= md >= depth_start
+    if depth_end is not None:
+        window &= md <= depth_end
+
+    rt_col = rt_column(df)
+    rt = df[rt_col].to_numpy(dtype=float)
+    vcl = df["VCL"].to_numpy(dtype=float)
+
+    if mid_perf_md is None:
+        mid_perf_md = curve_stat(df, "MD", "mean")
+    if "rsh" not in params:
+        rsh = curve_stat(df, rt_col, "min")
+
+    phi_params = {name: params[name] for name in PHI_PARAMETERS if name in params}
+    if not phi_params:
+        phie_fixed = df[PHI_COLUMNS[phi_select]].to_numpy(dtype=float)
+
+    sweep = {
+        "params": params,
+        "mean_sw": np.empty(sets),
+        "net_pay": np.empty(sets),
+        "hcpv": np.empty(sets),
+        "curves": {},
+    }
+    return_curves = set(return_curves or [])
+
+    chunk = max(1, int(max_chunk_bytes // (8 * max(len(md), 1))))
+
+    for start in range(0, sets, chunk):
+        stop = min(start + chunk, sets)
+
+        if phi_params:
+            phi = phi_arrays(
+                df,
+                curves=[PHI_COLUMNS[phi_select]],
+                **{
+                    **(phi_defaults or {}),
+                    **{name: value[start:stop, None] for name, value in phi_params.items()},
+                },
+            )
+            phie = phi[PHI_COLUMNS[phi_select]]
+        else:
+            phie = phie_fixed
+
+        sw_params = {
+            name: params[name][start:stop, None]
+            for name in SW_PARAMETERS
+            if name in params
+        }
+        if "rsh" in sw_params:
+            rsh = sw_params.pop("rsh")
+
+        sw, _ = sw_models(
+            phie,
+            vcl,
+            rt,
+            rsh,
+            mid_perf_md,
+            mid_perf_bht=mid_perf_bht,
+            surface_temp=surface_temp,
+            models=(sw_select,),
+            **sw_params,
+        )
+        sw = np.broadcast_to(sw[SW_COLUMNS[sw_select]], (stop - start, len(md)))
+        phie = np.broadcast_to(phie, sw.shape)
+
+        net_pay = (
+            (sw <= sw_cutoff) & (phie >= phi_cutoff) & (vcl <= vcl_cutoff) & window
+        )
+        net_thickness = np.where(net_pay, thickness, 0.0)
+
+        zone_sw = np.where(window, sw, np.nan)
+        sweep["mean_sw"][start:stop] = nanmean_depth(zone_sw)[:, 0]
+        sweep["net_pay"][start:stop] = net_thickness.sum(axis=1)
+        hc = np.where(net_pay, net_thickness * phie * (1 - sw), 0.0)
+        sweep["hcpv"][start:stop] = hc.sum(axis=1)
+
+        for index in return_curves.intersection(range(start, stop)):
+            sweep["curves"][index] = {
+                "PHIE": np.array(phie[index - start]),
+                "SW": np.array(sw[index - start]),
+            }
+
+        if progress is not None:
+            progress(stop / sets)
+
+    return sweep
+
+
+MONTE_CARLO_PARAMETERS = (
+    ["gr_clean", "gr_clay"]
+    + PHI_PARAMETERS
+    + SW_PARAMETERS
+    + ["sw_cutoff", "phi_cutoff", "vcl_cutoff"]
+)
+
+
+def sample_distribution(rng, spec, size):
+    """
+    Draw size samples from a distribution spec.
+
+    spec is either a number (constant) or a tuple whose first item names the
+    distribution: ("constant", value), ("uniform", low, high),
+    ("normal", mean, std), ("triangular", low, mode, high) or
+    ("lognormal", mean, sigma) with mean and sigma of the underlying normal.
+    """
+    if np.isscalar(spec):
+        return np.full(size, float(spec))
+
+    kind, *args = spec
+
+    if kind == "constant":
+        return np.full(size, float(args[0]))
+    elif kind == "uniform":
+        return rng.uniform(args[0], args[1], size)
+    elif kind == "normal":
+        return rng.normal(args[0], args[1], size)
+    elif kind == "triangular":
+        return rng.triangular(args[0], args[1], args[2], size)
+    elif kind == "lognormal":
+        return rng.lognormal(args[0], args[1], size)
+
+    raise ValueError(f"Unknown distribution: {kind}")
+
+
+def exceedance_percentiles(values, levels=(10, 50, 90)):
+    # Petroleum convention: P90 is exceeded by 90% of outcomes (the low case)
+    values = np.asarray(values, dtype=float)
+    if not np.isfinite(values).any():
+        return {f"P{level}": np.nan for level in levels}
+
+    return {f"P{level}": np.nanpercentile(values, 100 - level) for level in levels}
+
+
+def monte_carlo_batch(
+    df,
+    samples,
+    vcl_select="gr",
+    phi_select="neutron_density",
+    sw_select="archie",
+    correction_gr="young",
+    mid_perf_md=None,
+    mid_perf_bht=210,
+    surface_temp=60,
+    depth_start=None,
+    depth_end=None,
+    curves=("PHIE", "SW"),
+    curve_bins=20,
+    max_chunk_bytes=64 * 2**20,
+):
+    """
+    Push a batch of sampled parameter sets through VCL, PHI, SW and the cutoffs.
+
+    Parameters:
+    - df: DataFrame with 'MD' and the raw curves (sorted by MD).
+    - samples: dict of parameter name to 1-D array, one entry per realization.
+      Cutoffs missing from samples fall back to 0.8 (SW) and 0.2 (PHI, VCL).
+      gr_clean/gr_clay can only be sampled with vcl_select "gr".
+    - vcl_select: clay volume model, taken from the df curve when present.
+    - curve_bins: histogram bins over 0-1 per depth; counts use the smallest
+      unsigned type that holds the batch's realizations.
+
+    Returns:
+    - batch: dict with per-realization 'net_pay', 'hcpv' and 'mean_sw' arrays,
+      'histograms' per curve (depth x curve_bins counts over 0-1) and the
+      per-depth 'net_pay_count'.
+    """
+    realizations = len(next(iter(samples.values())))
+    md = df["MD"].to_numpy(dtype=float)
+    thickness = np.diff(depth_edges(md))
+
+    window = np.ones(len(md), dtype=bool)
+    if depth_start is not None:
+        window &= md >= depth_start
+    if depth_end is not None:
+        window &= md <= depth_end
+
+    rt_col = rt_column(df)
+    rt = df[rt_col].to_numpy(dtype=float)
+    rsh = curve_stat(df, rt_col, "min")
+
+    if mid_perf_md is None:
+        mid_perf_md = curve_stat(df, "MD", "mean")
+
+    vcl_sampled = "gr_clean" in samples or "gr_clay" in samples
+    phi_sampled = vcl_sampled or any(name in samples for name in PHI_PARAMETERS)
+
+    if vcl_sampled and vcl_select != "gr":
+        raise ValueError("gr_clean and gr_clay can only be sampled with vcl_select 'gr'")
+
+    if vcl_sampled:
+        vcl = None
+    elif VCL_COLUMNS[vcl_select] in df.columns:
+        vcl = df[VCL_COLUMNS[vcl_select]].to_numpy(dtype=float)
+    else:
+        vcl = vcl_arrays(df, correction_gr=correction_gr, models=[vcl_select])[
+            VCL_COLUMNS[vcl_select]
+        ]
+
+    batch = {
+        "net_pay": np.empty(realizations),
+        "hcpv": np.empty(realizations),
+        "mean_sw": np.empty(realizations),
+        "histograms": {
+            curve: np.zeros((len(md), curve_bins), dtype=np.min_scalar_type(realizations))
+            for curve in curves
+        },
+        "net_pay_count": np.zeros(len(md), dtype=np.int64),
+    }
+
+    # Roughly a dozen (chunk x depth) float arrays are alive at once
+    chunk = max(1, int(max_chunk_bytes // (96 * max(len(md), 1))))
+    depth_offsets = np.arange(len(md)) * curve_bins
+
+    for start in range(0, realizations, chunk):
+        stop = min(start + chunk, realizations)
+        column = {name: values[start:stop, None] for name, values in samples.items()}
+
+        if vcl_sampled:
+            vcl = vcl_arrays(
+                df,
+                gr_clean=column.get("gr_clean", curve_stat(df, "GR", "min")),
+                gr_clay=column.get("gr_clay", curve_stat(df, "GR", "max")),
+                correction_gr=correction_gr,
+                models=["gr"],
+            )["VCLGR"]
+
+        if phi_sampled or PHI_COLUMNS[phi_select] not in df.columns:
+            phi_params = {
+                name: column[name] for name in PHI_PARAMETERS if name in column
+            }
+            phie = phi_arrays(
+                df, vcl=vcl, curves=[PHI_COLUMNS[phi_select]], **phi_params
+            )[PHI_COLUMNS[phi_select]]
+        else:
+            phie = df[PHI_COLUMNS[phi_select]].to_numpy(dtype=float)
+
+        sw_params = {name: column[name] for name in SW_PARAMETERS if name in column}
+        sw, _ = sw_models(
+            phie,
+            vcl,
+            rt,
+            sw_params.pop("rsh", rsh),
+            mid_perf_md,
+            mid_perf_bht=mid_perf_bht,
+            surface_temp=surface_temp,
+            models=(sw_select,),
+            **sw_params,
+        )
+
+        shape = (stop - start, len(md))
+        sw = np.broadcast_to(sw[SW_COLUMNS[sw_select]], shape)
+        phie = np.broadcast_to(phie, shape)
+        vcl_chunk = np.broadcast_to(vcl, shape)
+
+        net_pay = (
+            (sw <= column.get("sw_cutoff", 0.8))
+            & (phie >= column.get("phi_cutoff", 0.2))
+            & (vcl_chunk <= column.get("vcl_cutoff", 0.2))
+        )
+        net_thickness = np.where(net_pay & window, thickness, 0.0)
+
+        batch["net_pay"][start:stop] = net_thickness.sum(axis=1)
+        hc = np.where(net_pay & window, net_thickness * phie * (1 - sw), 0.0)
+        batch["hcpv"][start:stop] = hc.sum(axis=1)
+        zone_sw = np.where(window, sw, np.nan)
+        batch["mean_sw"][start:stop] = nanmean_depth(zone_sw)[:, 0]
+        batch["net_pay_count"] += net_pay.sum(axis=0)
+
+        for curve, values in (("VCL", vcl_chunk), ("PHIE", phie), ("SW", sw)):
+            if curve not in curves:
+                continue
+
+            present = ~np.isnan(values)
+            bins = np.clip(
+                (np.where(present, values, 0.0) * curve_bins).astype(np.int64),
+                0,
+                curve_bins - 1,
+            )
+            flat = (bins + depth_offsets)[present]
+            batch["histograms"][curve] += (
+                np.bincount(flat, minlength=len(md) * curve_bins)
+                .reshape(len(md), curve_bins)
+                .astype(batch["histograms"][curve].dtype)
+            )
+
+    return batch
+
+
+def histogram_percentiles(histogram, levels=(10, 50, 90)):
+    # Per-depth exceedance percentiles from depth x bins counts over 0-1,
+    # interpolated linearly within the bin each percentile falls in
+    curve_bins = histogram.shape[1]
+    histogram = histogram.astype(float)
+    cumulative = np.cumsum(histogram, axis=1)
+    total = cumulative[:, -1]
+    rows = np.arange(len(histogram))
+
+    percentiles = {}
+    for level in levels:
+        target = total * (100 - level) / 100
+        bins = np.minimum((cumulative < target[:, None]).sum(axis=1), curve_bins - 1)
+        count = histogram[rows, bins]
+        below = cumulative[rows, bins] - count
+        fraction = np.divide(
+            target - below, count, out=np.full(len(rows), 0.5), where=count > 0
+        )
+        values = (bins + np.clip(fraction, 0, 1)) / curve_bins
+        percentiles[f"P{level}"] = np.where(total > 0, values, np.nan)
+
+    return percentiles
+
+
+def monte_carlo(
+    df,
+    distributions,
+    realizations=1000,
+    seed=None,
+    workers=None,
+    levels=(10, 50, 90),
+    progress=None,
+    **kwargs,
+):
+    """
+    Monte Carlo uncertainty of net pay and hydrocarbon pore volume.
+
+    Interpretation parameters are sampled from user-given distributions up front
+    with a seeded generator, so a seeded run gives the same result for any
+    number of workers. Realizations are evaluated with monte_carlo_batch, split
+    across a process pool when the run is large.
+
+    Parameters:
+    - df: DataFrame with 'MD' and the raw curves (sorted by MD).
+    - distributions: dict of parameter name (see MONTE_CARLO_PARAMETERS) to a
+      sample_distribution spec. gr_clean/gr_clay can only be sampled with the
+      GR clay volume (vcl_select "gr").
+    - realizations: number of realizations.
+    - seed: seed for numpy.random.default_rng.
+    - workers: process count. None picks os.cpu_count() for large runs and a
+      single process otherwise; 1 never starts a pool.
+    - levels: exceedance percentiles to report (P90 is the low case).
+    - progress: optional callable receiving the completed fraction after each
+      batch. Single-process runs are then split into sequential batches.
+    - kwargs: passed to monte_carlo_batch (model selection, zone, curves, ...).
+
+    Returns:
+    - result: dict with the sampled 'params', per-realization 'net_pay', 'hcpv'
+      and 'mean_sw' with their percentile 'summary', the 'MD' array, per-depth
+      'curves' percentiles and the 'net_pay_probability' curve.
+    """
+    unknown = set(distributions) - set(MONTE_CARLO_PARAMETERS)
+    if unknown:
+        raise ValueError(f"Unknown Monte Carlo parameters: {sorted(unknown)}")
+
+    rng = np.random.default_rng(seed)
+    samples = {
+        name: sample_distribution(rng, distributions[name], realizations)
+        for name in MONTE_CARLO_PARAMETERS
+        if name in distributions
+    }
+    if not samples:
+        samples = {"sw_cutoff": np.full(realizations, 0.8)}
+
+    if workers is None:
+        workers = (os.cpu_count() or 1) if realizations * len(df) > 5 * 10**7 else 1
+    workers = max(1, min(workers, realizations))
+
+    if workers == 1 and progress is None:
+        batches = [monte_carlo_batch(df, samples, **kwargs)]
+    else:
+        splits = np.array_split(
+            np.arange(realizations), workers if workers > 1 else min(10, realizations)
+        )
+        batch_samples = [
+            {name: values[split] for name, values in samples.items()}
+            for split in splits
+        ]
+
+        if workers == 1:
+            batches = []
+            for batch in batch_samples:
+                batches.append(monte_carlo_batch(df, batch, **kwargs))
+                progress(len(batches) / len(batch_samples))
+        else:
+            with ProcessPoolExecutor(max_workers=workers) as pool:
+                futures = [
+                    pool.submit(monte_carlo_batch, df, batch, **kwargs)
+                    for batch in batch_samples
+                ]
+                try:
+                    for done, future in enumerate(futures, start=1):
+                        future.result()
+                        if progress is not None:
+                            progress(done / len(futures))
+                except BaseException:
+                    for future in futures:
+                        future.cancel()
+                    raise
+                batches = [future.result() for future in futures]
+
+    result = {"params": samples, "MD": df["MD"].to_numpy(dtype=float)}
+
+    for key in ["net_pay", "hcpv", "mean_sw"]:
+        result[key] = np.concatenate([batch[key] for batch in batches])
+
+    result["summary"] = {
+        key: exceedance_percentiles(result[key], levels)
+        for key in ["net_pay", "hcpv", "mean_sw"]
+    }
+    result["net_pay_probability"] = (
+        sum(batch["net_pay_count"] for batch in batches) / realizations
+    )
+    result["curves"] = {
+        curve: histogram_percentiles(
+            sum(
+                batch["histograms"][curve].astype(np.min_scalar_type(realizations))
+                for batch in batches
+            ),
+            levels,
+        )
+        for curve in batches[0]["histograms"]
+    }
+
+    return result
+
+
+def select_sw(df, select_sw="archie"):
+    if select_sw == "archie":
+        try:
+            df["SW"] = df["SWarchie"]
+        except KeyError:
+            print("No SWarchie column found. Please check the column names.")
 
             return df
     elif select_sw == "waxman":
@@ -1625,7 +3127,64 @@ def interpretation_plot(
     return fig
 
 
-def calculate_net_pay(df, sw_cutoff=0.2, vcl_cutoff=0.2, phi_cutoff=0.2):
+def depth_edges(md):
+    # Sample boundaries halfway between depths, so each sample owns its own thickness
+    md = np.asarray(md, dtype=float)
+    edges = np.empty(len(md) + 1)
+
+    if len(md) == 0:
+        return edges[:0]
+    if len(md) == 1:
+        edges[:] = md[0]
+        return edges
+
+    edges[1:-1] = (md[1:] + md[:-1]) / 2
+    edges[0] = md[0] - (md[1] - md[0]) / 2
+    edges[-1] = md[-1] + (md[-1] - md[-2]) / 2
+
+    return edges
+
+
+def net_pay_runs(flag, md, min_thickness=0, merge_gap=0):
+    """
+    Run-length encode a net pay flag into depth intervals.
+
+    Parameters:
+    - flag: boolean array-like, True for net pay samples (sorted by MD).
+    - md: array-like measured depth of each sample.
+    - min_thickness: drop intervals thinner than this (depth units).
+    - merge_gap: merge neighbouring intervals separated by at most this much
+      non-pay (depth units) before applying min_thickness.
+
+    Returns:
+    - start_idx, end_idx: numpy arrays of the first and last sample of each interval.
+    - start_depth, end_depth: numpy arrays of the MD at those samples.
+    """
+    flag = np.asarray(flag, dtype=bool)
+    md = np.asarray(md, dtype=float)
+
+    padded = np.concatenate(([False], flag, [False]))
+    change = np.flatnonzero(padded[1:] != padded[:-1])
+    start_idx, end_idx = change[0::2], change[1::2] - 1
+
+    edges = depth_edges(md)
+
+    if merge_gap > 0 and len(start_idx) > 1:
+        gaps = edges[start_idx[1:]] - edges[end_idx[:-1] + 1]
+        breaks = gaps > merge_gap
+        start_idx = start_idx[np.concatenate(([True], breaks))]
+        end_idx = end_idx[np.concatenate((breaks, [True]))]
+
+    if min_thickness > 0:
+        thick_enough = edges[end_idx + 1] - edges[start_idx] >= min_thickness
+        start_idx, end_idx = start_idx[thick_enough], end_idx[thick_enough]
+
+    return start_idx, end_idx, md[start_idx], md[end_idx]
+
+
+def calculate_net_pay(
+    df, sw_cutoff=0.2, vcl_cutoff=0.2, phi_cutoff=0.2, min_thickness=0, merge_gap=0
+):
     # Apply conditions
     net_pay_condition = (
         (df["SW"] <= sw_cutoff)  # SW below cutoff (indicating oil)
@@ -1633,29 +3192,117 @@ def calculate_net_pay(df, sw_cutoff=0.2, vcl_cutoff=0.2, phi_cutoff=0.2):
         & (
             df["VCL"] <= vcl_cutoff
         )  # Clay volume below cutoff (indicating productive zone)
+    ).to_numpy()
+
+    # Identify the depth intervals for net pay
+    start_idx, end_idx, start_depth, end_depth = net_pay_runs(
+        net_pay_condition, df["MD"], min_thickness=min_thickness, merge_gap=merge_gap
     )
 
+    # Only keep flagged samples inside the retained intervals
+    inside = np.zeros(len(df) + 1, dtype=int)
+    inside[start_idx] += 1
+    inside[end_idx + 1] -= 1
+    inside = np.cumsum(inside[:-1]) > 0
+
     # Create a column for net pay flag (1 for net pay, 0 for non-net pay)
-    df["Net_Pay"] = np.where(net_pay_condition, 1, 0)
+    df["Net_Pay"] = np.where(net_pay_condition & inside, 1, 0)
 
-    # Identify the depth intervals for net pay (where Net_Pay == 1)
-    net_pay_intervals = []
-    start_depth = None
+    net_pay_intervals = list(zip(start_depth.tolist(), end_depth.tolist()))
 
-    for idx in range(len(df)):
-        if df["Net_Pay"].iloc[idx] == 1:
-            if start_depth is None:
-                start_depth = df["MD"].iloc[idx]  # Start of a new net pay zone
-            end_depth = df["MD"].iloc[idx]  # Update end depth to current depth
-        elif start_depth is not None:
-            net_pay_intervals.append((start_depth, end_depth))
-            start_depth = None
+    return df, net_pay_intervals
 
-    # In case the last net pay zone ends at the last depth
-    if start_depth is not None:
-        net_pay_intervals.append((start_depth, end_depth))
 
-    return df, net_pay_intervals
+def cutoff_sensitivity(
+    df,
+    sw_cutoffs,
+    phi_cutoffs,
+    vcl_cutoffs,
+    depth_start=None,
+    depth_end=None,
+    max_chunk_bytes=64 * 2**20,
+):
+    """
+    Net pay for every (SW, PHI, VCL) cutoff triple in one call.
+
+    Samples are sorted by SW once. For each (PHI, VCL) pair the passing sample
+    thickness is accumulated along that order, so every SW cutoff is a single
+    lookup into the cumulative sum. (PHI, VCL) pairs are processed in chunks
+    holding at most max_chunk_bytes of working arrays.
+
+    Parameters:
+    - df: DataFrame containing 'MD', 'SW', 'PHIE', 'VCL' columns (sorted by MD).
+    - sw_cutoffs, phi_cutoffs, vcl_cutoffs: array-like cutoff grids.
+    - depth_start, depth_end: optional depth window (defaults to the whole well).
+    - max_chunk_bytes: memory bound for the per-chunk working arrays.
+
+    Returns:
+    - cube: dict with the three cutoff grids and 'net_pay' (net pay thickness),
+      'ntg' and 'hcpv' (hydrocarbon pore thickness), each shaped
+      (len(sw_cutoffs), len(phi_cutoffs), len(vcl_cutoffs)).
+    """
+    sw_cutoffs = np.atleast_1d(np.asarray(sw_cutoffs, dtype=float))
+    phi_cutoffs = np.atleast_1d(np.asarray(phi_cutoffs, dtype=float))
+    vcl_cutoffs = np.atleast_1d(np.asarray(vcl_cutoffs, dtype=float))
+
+    md = df["MD"].to_numpy(dtype=float)
+    thickness = np.diff(depth_edges(md))
+
+    window = np.ones(len(md), dtype=bool)
+    if depth_start is not None:
+        window &= md >= depth_start
+    if depth_end is not None:
+        window &= md <= depth_end
+
+    sw = df["SW"].to_numpy(dtype=float)[window]
+    order = np.argsort(sw, kind="stable")
+    sw = sw[order]
+    phie = df["PHIE"].to_numpy(dtype=float)[window][order]
+    vcl = df["VCL"].to_numpy(dtype=float)[window][order]
+    thickness = thickness[window][order]
+
+    hc = thickness * phie * (1 - sw)
+    hc = np.where(np.isfinite(hc), hc, 0.0)
+    gross = thickness.sum()
+
+    # Number of SW-sorted samples passing each SW cutoff (NaN sorts last)
+    sw_pos = np.searchsorted(sw, sw_cutoffs, side="right")
+
+    phi_pairs, vcl_pairs = np.meshgrid(phi_cutoffs, vcl_cutoffs, indexing="ij")
+    phi_pairs, vcl_pairs = phi_pairs.ravel(), vcl_pairs.ravel()
+
+    net_pay = np.empty((len(phi_pairs), len(sw_cutoffs)))
+    hcpv = np.empty((len(phi_pairs), len(sw_cutoffs)))
+
+    # Boolean mask plus two float cumulative sums per pair
+    chunk = max(1, int(max_chunk_bytes // (17 * (len(sw) + 1))))
+
+    for start in range(0, len(phi_pairs), chunk):
+        stop = start + chunk
+        mask = (phie >= phi_pairs[start:stop, None]) & (
+            vcl <= vcl_pairs[start:stop, None]
+        )
+
+        for target, values in ((net_pay, thickness), (hcpv, hc)):
+            cumulative = np.zeros((mask.shape[0], len(sw) + 1))
+            np.cumsum(np.where(mask, values, 0.0), axis=1, out=cumulative[:, 1:])
+            target[start:stop] = cumulative[:, sw_pos]
+
+    shape = (len(phi_cutoffs), len(vcl_cutoffs), len(sw_cutoffs))
+    net_pay = np.moveaxis(net_pay.reshape(shape), -1, 0)
+    hcpv = np.moveaxis(hcpv.reshape(shape), -1, 0)
+
+    with np.errstate(invalid="ignore", divide="ignore"):
+        ntg = net_pay / gross
+
+    return {
+        "sw_cutoffs": sw_cutoffs,
+        "phi_cutoffs": phi_cutoffs,
+        "vcl_cutoffs": vcl_cutoffs,
+        "net_pay": net_pay,
+        "ntg": ntg,
+        "hcpv": hcpv,
+    }
 
 
 def plot_with_cutoffs(df, sw_cutoff=0.2, vcl_cutoff=0.2, phi_cutoff=0.2):
@@ -1734,10 +3381,103 @@ def plot_with_cutoffs(df, sw_cutoff=0.2, vcl_cutoff=0.2, phi_cutoff=0.2):
     # plt.show()
 
 
+def interval_index(df):
+    """
+    Build a cumulative-sum index over the MD-sorted curves used by interval summaries.
+
+    Every sample is weighted by its own thickness (see depth_edges), so the sums
+    stay correct for any sample step. Summing a depth window then takes two
+    binary searches and one subtraction per quantity.
+
+    Parameters:
+    - df: DataFrame containing 'MD', 'PERM', 'VCL', 'SW', 'Net_Pay', 'PHIE' columns.
+
+    Returns:
+    - index: dict with the sorted 'MD' array and the cumulative sums, each with a
+      leading zero so that sums[hi] - sums[lo] covers samples lo..hi-1.
+    """
+    order = np.argsort(df["MD"].to_numpy(dtype=float), kind="stable")
+    md = df["MD"].to_numpy(dtype=float)[order]
+    thickness = np.diff(depth_edges(md))
+
+    net_pay = df["Net_Pay"].to_numpy(dtype=float)[order] == 1
+    net_thickness = np.where(net_pay, thickness, 0.0)
+
+    curves = {
+        col: df[col].to_numpy(dtype=float)[order]
+        for col in ["PHIE", "SW", "VCL", "PERM"]
+    }
+    hc = curves["PHIE"] * (1 - curves["SW"])
+
+    def cumulative(values):
+        # NaN samples contribute nothing instead of poisoning every later sum
+        values = np.where(np.isfinite(values), values, 0.0)
+        return np.concatenate(([0.0], np.cumsum(values)))
+
+    index = {
+        "MD": md,
+        "gross": cumulative(thickness),
+        "net": cumulative(net_thickness),
+        "fhcp": cumulative(net_thickness * hc),
+        "bopd": cumulative(net_thickness * curves["PERM"] * hc),
+    }
+
+    for col in ["PHIE", "SW", "VCL"]:
+        values = curves[col]
+        index[col] = cumulative(net_thickness * values)
+        index[f"{col}_weight"] = cumulative(
+            np.where(np.isfinite(values), net_thickness, 0.0)
+        )
+
+    return index
+
+
+def interval_summary(index, depth_intervals, oil_viscosity=1, oil_fvf=1.2):
+    """
+    Summarize any number of depth intervals from an interval_index.
+
+    Parameters:
+    - index: dict returned by interval_index.
+    - depth_intervals: List of lists where each list contains [start_depth, end_depth].
+    - oil_viscosity: Oil viscosity in cP (default is 1 cP).
+    - oil_fvf: Oil Formation Volume Factor in bbl/STB (default is 1.2 bbl/STB).
+
+    Returns:
+    - result_df: DataFrame with the same columns as calculate_net_pay_bopd.
+      NTG and averages are thickness weighted and NaN for empty intervals.
+    """
+    intervals = np.asarray(depth_intervals, dtype=float).reshape(-1, 2)
+    start_depth, end_depth = intervals[:, 0], intervals[:, 1]
+
+    lo = np.searchsorted(index["MD"], start_depth, side="left")
+    hi = np.searchsorted(index["MD"], end_depth, side="right")
+    hi = np.maximum(hi, lo)
+
+    def window(key):
+        return index[key][hi] - index[key][lo]
+
+    with np.errstate(invalid="ignore", divide="ignore"):
+        result_df = pd.DataFrame(
+            {
+                "Start Depth": start_depth,
+                "End Depth": end_depth,
+                "NTG Ratio": window("net") / window("gross"),
+                "Net Pay (FHCP)": window("fhcp"),
+                "Net Pay (BOPD)": window("bopd") * oil_fvf / (oil_viscosity * 1000),
+                "Avg PHI": window("PHIE") / window("PHIE_weight"),
+                "Avg SW": window("SW") / window("SW_weight"),
+                "Avg VCL": window("VCL") / window("VCL_weight"),
+            }
+        )
+
+    return result_df
+
+
 def calculate_net_pay_bopd(df, depth_intervals, oil_viscosity=1, oil_fvf=1.2):
     """
     Calculate Net Pay in BOPD for multiple depth intervals where Net Pay = 1.
     This version includes oil viscosity and oil FVF (Formation Volume Factor).
+    Each sample contributes its actual thickness rather than a fixed 1 unit.
 
     Parameters:
     - df: DataFrame containing 'MD', 'PERM', 'VCL', 'SW', 'Net Pay', 'PHIE' columns.
@@ -1748,61 +3488,571 @@ def calculate_net_pay_bopd(df, depth_intervals, oil_viscosity=1, oil_fvf=1.2):
     Returns:
     - result_df: DataFrame with 'start_depth', 'end_depth', and 'Net Pay (BOPD)' columns.
     """
-    results = []
+    return interval_summary(
+        interval_index(df), depth_intervals, oil_viscosity=oil_viscosity, oil_fvf=oil_fvf
+    )
 
-    # Iterate through each depth interval
-    for interval in depth_intervals:
-        start_depth, end_depth = interval
 
-        # Filter the data for the specified depth interval
-        df_interval = df[(df["MD"] >= start_depth) & (df["MD"] <= end_depth)]
+def calc_cutoff_curves(df):
+    df["BVW"] = df["SW"] * df["PHIE"]
+    df["MATRIX"] = 1 - df["VCL"] - df["PHIE"]
+    df["PERM"] = perm_timur(df["PHIE"], df["SW"])
 
-        # Initialize the net pay BOPD sum for this interval
-        net_pay_fhcp = 0
-        net_pay_bopd = 0
+    return df
 
-        # Iterate over the rows in the filtered dataframe
-        for _, row in df_interval.iterrows():
-            if row["Net_Pay"] == 1:  # Only consider rows where Net Pay = 1
-                # Calculate BOPD for this row (adjusted with oil viscosity and FVF)
-                net_pay_thickness = (
-                    1  # Assuming 1 meter or foot thickness per row (adjust as needed)
-                )
 
-                # Calculate BOPD for this row (adjusted with oil viscosity and FVF)
-                bopd_contribution = (
-                    row["PERM"]
-                    * row["PHIE"]
-                    * (1 - row["SW"])
-                    * net_pay_thickness
-                    * oil_fvf
-                ) / (oil_viscosity * 1000)
-                fhcp_contribution = net_pay_thickness * row["PHIE"] * (1 - row["SW"])
-
-                # Add this row's contribution to the total BOPD
-                net_pay_bopd += bopd_contribution
-                net_pay_fhcp += fhcp_contribution
-
-        ntg_ratio = len(df_interval[df_interval["Net_Pay"] == 1]) / len(df_interval)
-        avg_phi = mean(df_interval[df_interval["Net_Pay"] == 1]["PHIE"])
-        avg_sw = mean(df_interval[df_interval["Net_Pay"] == 1]["SW"])
-        avg_vcl = mean(df_interval[df_interval["Net_Pay"] == 1]["VCL"])
-
-        # Append the result for this interval
-        results.append([start_depth, end_depth, ntg_ratio, net_pay_fhcp, net_pay_bopd, avg_phi, avg_sw, avg_vcl])
-
-    # Convert the results to a DataFrame
-    result_df = pd.DataFrame(
-        results,
-        columns=[
-            "Start Depth",
-            "End Depth",
-            "NTG Ratio",
-            "Net Pay (FHCP)",
-            "Net Pay (BOPD)",
-            "Avg PHI",
-            "Avg SW",
-            "Avg VCL",
+# Derived-curve dependency graph: one node per model, listing the nodes and raw
+# curves it reads, the parameters it takes and the curves it writes. A node is
+# recomputed only when one of its parameters, a parent node or one of its raw
+# input curves changed. Nodes picking one model's curve ("select": parameter,
+# its default and the model curves) depend only on the node writing that curve.
+# Nodes of a stage share its parameters, each taking the ones it uses.
+DERIVED_CURVE_GRAPH = {
+    "VCLGR": {
+        "stage": "vcl_models",
+        "model": "gr",
+        "parents": [],
+        "inputs": ["GR"],
+        "params": ["gr_clean", "gr_clay", "correction_gr"],
+        "outputs": ["VCLGR"],
+    },
+    "VCLSP": {
+        "stage": "vcl_models",
+        "model": "sp",
+        "parents": [],
+        "inputs": ["GR", "SP"],
+        "params": ["sp_clean", "sp_clay"],
+        "outputs": ["VCLSP"],
+    },
+    "VCLRT": {
+        "stage": "vcl_models",
+        "model": "rt",
+        "parents": [],
+        "inputs": ["RT", "RDEEP"],
+        "params": ["rt_clean", "rt_clay"],
+        "outputs": ["VCLRT"],
+    },
+    "VCLND": {
+        "stage": "vcl_models",
+        "model": "nd",
+        "parents": [],
+        "inputs": ["NPHI", "RHOB"],
+        "params": [
+            "neut_clean1",
+            "den_clean1",
+            "neut_clean2",
+            "den_clean2",
+            "neut_clay",
+            "den_clay",
         ],
+        "outputs": ["VCLND"],
+    },
+    "vcl": {
+        "stage": "vcl",
+        "select": ("select_vcl", "gr", VCL_COLUMNS),
+        "parents": [],
+        "inputs": [],
+        "params": ["select_vcl"],
+        "outputs": ["VCL"],
+    },
+    "PHISw": {
+        "stage": "phi_models",
+        "parents": [],
+        "inputs": ["DTC"],
+        "params": ["dt_ma", "dt_fl", "cp"],
+        "outputs": ["PHISw"],
+    },
+    "PHISwshc": {
+        "stage": "phi_models",
+        "parents": ["vcl"],
+        "inputs": ["DTC"],
+        "params": ["dt_ma", "dt_fl", "dt_sh"],
+        "outputs": ["PHISwshc"],
+    },
+    "PHISrhg": {
+        "stage": "phi_models",
+        "parents": [],
+        "inputs": ["DTC"],
+        "params": ["dt_ma", "alpha"],
+        "outputs": ["PHISrhg"],
+    },
+    "PHISrhgshc": {
+        "stage": "phi_models",
+        "parents": ["vcl"],
+        "inputs": ["DTC"],
+        "params": ["dt_ma", "dt_fl", "dt_sh", "alpha"],
+        "outputs": ["PHISrhgshc"],
+    },
+    "PHID": {
+        "stage": "phi_models",
+        "parents": [],
+        "inputs": ["RHOB"],
+        "params": ["den_ma", "den_fl"],
+        "outputs": ["PHID"],
+    },
+    "PHIDshc": {
+        "stage": "phi_models",
+        "parents": ["vcl"],
+        "inputs": ["RHOB"],
+        "params": ["den_ma", "den_fl", "den_sh"],
+        "outputs": ["PHIDshc"],
+    },
+    "PHINshc": {
+        "stage": "phi_models",
+        "parents": ["vcl"],
+        "inputs": ["NPHI"],
+        "params": ["neut_sh"],
+        "outputs": ["PHINshc"],
+    },
+    "PHIxND": {
+        "stage": "phi_models",
+        "parents": ["vcl"],
+        "inputs": ["NPHI", "RHOB"],
+        "params": ["den_ma", "den_fl", "den_sh", "neut_sh"],
+        "outputs": ["PHIxND", "PHIxNDgc"],
+    },
+    "phie": {
+        "stage": "phie",
+        "select": ("select_phi", "neutron_density", PHI_COLUMNS),
+        "parents": [],
+        "inputs": [],
+        "params": ["select_phi"],
+        "outputs": ["PHIE"],
+    },
+    "SWarchie": {
+        "stage": "sw_models",
+        "model": "archie",
+        "parents": ["phie"],
+        "inputs": ["RT", "RDEEP"],
+        "params": ["rw", "a", "m", "n"],
+        "outputs": ["SWarchie"],
+    },
+    "SWwaxman": {
+        "stage": "sw_models",
+        "model": "waxman",
+        "parents": ["vcl", "phie"],
+        "inputs": ["RT", "RDEEP", "MD"],
+        "params": [
+            "rw",
+            "a",
+            "m",
+            "n",
+            "mid_perf_md",
+            "mid_perf_bht",
+            "surface_temp",
+            "waxman_tol",
+            "waxman_max_iter",
+        ],
+        "outputs": ["SWwaxman"],
+    },
+    "SWindonesia": {
+        "stage": "sw_models",
+        "model": "indo",
+        "parents": ["vcl", "phie"],
+        "inputs": ["RT", "RDEEP"],
+        "params": ["rw", "a", "m", "n", "rsh"],
+        "outputs": ["SWindonesia"],
+    },
+    "sw": {
+        "stage": "sw",
+        "select": ("select_sw", "archie", SW_COLUMNS),
+        "parents": [],
+        "inputs": [],
+        "params": ["select_sw"],
+        "outputs": ["SW"],
+    },
+    "cutoff": {
+        "stage": "cutoff",
+        "parents": ["vcl", "phie", "sw"],
+        "inputs": [],
+        "params": [],
+        "outputs": ["BVW", "MATRIX", "PERM"],
+    },
+    "net_pay": {
+        "stage": "net_pay",
+        "parents": ["vcl", "phie", "sw"],
+        "inputs": ["MD"],
+        "params": [
+            "sw_cutoff",
+            "vcl_cutoff",
+            "phi_cutoff",
+            "min_thickness",
+            "merge_gap",
+        ],
+        "outputs": ["Net_Pay"],
+    },
+}
+
+DERIVED_CURVE_STAGES = list(
+    dict.fromkeys(spec["stage"] for spec in DERIVED_CURVE_GRAPH.values())
+)
+
+
+def new_curve_graph():
+    return {"params": {}, "keys": {}, "outputs": {}}
+
+
+def node_parents(node, params):
+    # A selecting node depends only on the node writing the curve it selects
+    spec = DERIVED_CURVE_GRAPH[node]
+    if "select" not in spec:
+        return spec["parents"]
+
+    param, default, columns = spec["select"]
+    col = columns.get(params.get(param, default))
+    return [
+        parent
+        for parent, parent_spec in DERIVED_CURVE_GRAPH.items()
+        if col in parent_spec["outputs"]
+    ]
+
+
+def node_parameters(params):
+    """
+    Split parameters given by stage or node name into parameters by node.
+
+    A stage's arguments go to each of its nodes that uses them; a node's own
+    arguments are added over its stage's. Raises ValueError for an unknown
+    name and TypeError for an argument none of its nodes takes.
+    """
+    by_node = {}
+
+    for name, values in params.items():
+        nodes = [
+            node
+            for node, spec in DERIVED_CURVE_GRAPH.items()
+            if spec["stage"] == name or node == name
+        ]
+        if not nodes:
+            raise ValueError(f"Unknown derived curve stage or node: {name}")
+
+        taken = {
+            param for node in nodes for param in DERIVED_CURVE_GRAPH[node]["params"]
+        }
+        unexpected = set(values) - taken
+        if unexpected:
+            raise TypeError(f"{name} got unexpected parameters: {sorted(unexpected)}")
+
+        for node in nodes:
+            by_node.setdefault(node, {}).update(
+                (param, value)
+                for param, value in values.items()
+                if param in DERIVED_CURVE_GRAPH[node]["params"]
+            )
+
+    return by_node
+
+
+def curve_version(df, col):
+    # Column version bound for the request, else a fingerprint of the curve
+    version = bound_version(df, col)
+    return str(version) if version is not None else curve_fingerprint(df[col])
+
+
+def compute_derived_curve(df, node, params):
+    spec = DERIVED_CURVE_GRAPH[node]
+    output = None
+
+    if spec["stage"] == "vcl_models":
+        df = calc_vcl(df, models=[spec["model"]], **params)
+    elif node == "vcl":
+        df = select_vcl(df, **params)
+    elif spec["stage"] == "phi_models":
+        df = calc_phi(df, curves=spec["outputs"], **params)
+    elif node == "phie":
+        df = select_phi(df, **params)
+    elif spec["stage"] == "sw_models":
+        df = calc_sw(df, models=[spec["model"]], **params)
+    elif node == "sw":
+        df = select_sw(df, **params)
+    elif node == "cutoff":
+        df = calc_cutoff_curves(df)
+    elif node == "net_pay":
+        df, output = calculate_net_pay(df, **params)
+
+    return df, output
+
+
+def update_derived_curves(df, graph, params=None, targets=None):
+    """
+    Bring derived curves up to date, recomputing only what changed.
+
+    Each node gets a key hashed from its parameters, its parents' keys and the
+    versions of its raw input curves. A node whose key matches the one recorded
+    in graph keeps its curves in df; otherwise it is recomputed, which changes
+    its key and so marks every descendant dirty as well. Nodes that never had
+    parameters set but whose curves already exist in df (for example a frame
+    loaded from parquet) are taken as given.
+
+    Curve versions are the column versions bound with bind_curve_stats; curves
+    of an unbound frame are fingerprinted instead.
+
+    Parameters:
+    - df: well DataFrame, updated in place.
+    - graph: state dict from new_curve_graph, kept between calls.
+    - params: dict of stage or node name to its keyword arguments, split among
+      nodes by node_parameters. They replace each node's previous parameters.
+    - targets: nodes to bring up to date (defaults to the nodes in params).
+
+    Returns:
+    - df: the updated DataFrame.
+    - recomputed: list of the nodes that were recomputed, in order.
+    """
+    params = node_parameters(params or {})
+    for node, node_params in params.items():
+        graph["params"][node] = dict(node_params)
+
+    keys = {}
+    recomputed = []
+
+    def refresh(node):
+        nonlocal df
+
+        if node in keys:
+            return keys[node]
+
+        spec = DERIVED_CURVE_GRAPH[node]
+        node_params = graph["params"].get(node)
+        outputs = [col for col in spec["outputs"] if col in df.columns]
+
+        if node_params is None and outputs:
+            keys[node] = "given:" + ",".join(curve_version(df, col) for col in outputs)
+            return keys[node]
+
+        key_data = {
+            "node": node,
+            "params": node_params or {},
+            "parents": [
+                refresh(parent) for parent in node_parents(node, node_params or {})
+            ],
+            "inputs": {
+                col: curve_version(df, col)
+                for col in spec["inputs"]
+                if col in df.columns
+            },
+        }
+        key = hashlib.blake2b(
+            json.dumps(key_data, sort_keys=True, default=str).encode(),
+            digest_size=16,
+        ).hexdigest()
+
+        if graph["keys"].get(node) != key or not outputs:
+            df, graph["outputs"][node] = compute_derived_curve(
+                df, node, node_params or {}
+            )
+            graph["keys"][node] = key
+            recomputed.append(node)
+
+        keys[node] = key
+        return key
+
+    for node in targets or list(params.keys()):
+        refresh(node)
+
+    return df, recomputed
+
+
+# Defaults of the backend step endpoints where they differ from the functions'
+PIPELINE_DEFAULTS = {
+    "phi_models": {"cp": 0.67, "alpha": 1},
+    "net_pay": {"sw_cutoff": 0.8, "phi_cutoff": 0.2, "vcl_cutoff": 0.2},
+}
+
+PIPELINE_CURVES = ["VCL", "PHIE", "SW", "BVW", "MATRIX", "PERM", "Net_Pay"]
+
+
+def run_pipeline(
+    df, params=None, graph=None, curves=None, oil_viscosity=1, oil_fvf=1.2
+):
+    """
+    Run VCL, PHI, SW, cutoff curves and net pay on a well in one pass.
+
+    Every node of DERIVED_CURVE_GRAPH is brought up to date in memory. With a
+    graph kept from an earlier call, nodes whose parameters and inputs did not
+    change are not recomputed.
+
+    Parameters:
+    - df: well DataFrame with 'MD' and the raw curves, updated in place.
+    - params: dict of stage or node name to its keyword arguments, e.g.
+      {"vcl_models": {"gr_clean": 20}, "sw_models": {"rw": 0.05},
+      "PHISw": {"cp": 1}, "net_pay": {"sw_cutoff": 0.7}}. Missing stages and
+      arguments take the step endpoints' defaults (PIPELINE_DEFAULTS, then the
+      functions').
+    - graph: state dict from new_curve_graph (a fresh one if not given).
+    - curves: curve names to return (defaults to PIPELINE_CURVES).
+    - oil_viscosity, oil_fvf: passed to interval_summary.
+
+    Returns:
+    - df: the updated DataFrame.
+    - result: dict with the 'recomputed' nodes, net pay 'intervals', their
+      interval_summary 'summary' DataFrame and the requested 'curves' arrays.
+    """
+    params = params or {}
+    unknown = set(params) - set(DERIVED_CURVE_STAGES) - set(DERIVED_CURVE_GRAPH)
+    if unknown:
+        raise ValueError(f"Unknown pipeline stages: {sorted(unknown)}")
+
+    graph = graph if graph is not None else new_curve_graph()
+
+    # Node arguments come after their stage's, so they override them
+    df, recomputed = update_derived_curves(
+        df,
+        graph,
+        {
+            **{
+                stage: {**PIPELINE_DEFAULTS.get(stage, {}), **params.get(stage, {})}
+                for stage in DERIVED_CURVE_STAGES
+            },
+            **{
+                name: values
+                for name, values in params.items()
+                if name not in DERIVED_CURVE_STAGES
+            },
+        },
     )
-    return result_df
+    intervals = graph["outputs"]["net_pay"]
+
+    result = {
+        "recomputed": recomputed,
+        "intervals": intervals,
+        "summary": interval_summary(
+            interval_index(df), intervals, oil_viscosity=oil_viscosity, oil_fvf=oil_fvf
+        ),
+        "curves": {
+            col: df[col].to_numpy()
+            for col in (PIPELINE_CURVES if curves is None else curves)
+            if col in df.columns
+        },
+    }
+
+    return df, result
+
+
+PYRAMID_FACTOR = 4
+
+
+def decimate_min_max(low, high, factor=PYRAMID_FACTOR):
+    """
+    Merge every `factor` consecutive bins of a min/max envelope into one.
+
+    NaN samples are skipped, so a bin is NaN only when all its samples are.
+    """
+    length = -(-len(low) // factor) * factor
+    padded_low = np.full(length, np.nan)
+    padded_high = np.full(length, np.nan)
+    padded_low[: len(low)] = low
+    padded_high[: len(high)] = high
+
+    return (
+        np.fmin.reduce(padded_low.reshape(-1, factor), axis=1),
+        np.fmax.reduce(padded_high.reshape(-1, factor), axis=1),
+    )
+
+
+def curve_pyramid(values, factor=PYRAMID_FACTOR):
+    # Level 0 is the curve itself, each next level is `factor` times coarser
+    values = np.asarray(values, dtype=float)
+    levels = [(values, values)]
+
+    while len(levels[-1][0]) > 1:
+        levels.append(decimate_min_max(*levels[-1], factor=factor))
+
+    return levels
+
+
+def depth_pyramid(df, depth_column="MD", factor=PYRAMID_FACTOR, pyramid=None, versions=None):
+    """
+    Build min/max decimation pyramids for every numeric curve of a well.
+
+    Each level keeps the minimum and maximum of the samples it merges, so
+    spikes stay visible at any zoom. Passing the previous pyramid with the
+    curves' versions rebuilds only the curves whose version changed.
+
+    Parameters:
+    - df: DataFrame with the curves, depth increasing.
+    - depth_column: depth curve the levels are indexed by.
+    - factor: number of bins merged per level.
+    - pyramid: pyramid from an earlier call, to reuse unchanged curves.
+    - versions: curve name to a version that changes whenever the curve does.
+      Curves without a version are always rebuilt.
+
+    Returns:
+    - dict with "factor", "depth" (depth top/base per level) and "curves"
+      (curve name to its version and min/max levels).
+    """
+    versions = versions or {}
+    depth_version = versions.get(depth_column)
+
+    if (
+        pyramid is None
+        or pyramid["factor"] != factor
+        or pyramid["depth_column"] != depth_column
+        or depth_version is None
+        or pyramid["depth_version"] != depth_version
+    ):
+        pyramid = {
+            "factor": factor,
+            "depth_column": depth_column,
+            "depth_version": depth_version,
+            "depth": curve_pyramid(df[depth_column], factor),
+            "curves": {},
+        }
+
+    curves = {}
+
+    for col in df.select_dtypes(include="number").columns:
+        if col == depth_column:
+            continue
+
+        version = versions.get(col)
+        previous = pyramid["curves"].get(col)
+
+        if version is not None and previous is not None and previous["version"] == version:
+            curves[col] = previous
+        else:
+            curves[col] = {"version": version, "levels": curve_pyramid(df[col], factor)}
+
+    return {**pyramid, "curves": curves}
+
+
+def pyramid_window(pyramid, depth_start=None, depth_end=None, pixels=1000, columns=None):
+    """
+    Select the finest pyramid level that fits a depth window in `pixels` bins.
+
+    Parameters:
+    - pyramid: result of depth_pyramid.
+    - depth_start, depth_end: depth window (defaults to the whole well).
+    - pixels: maximum number of bins to return, e.g. the track height.
+    - columns: curves to return (defaults to all).
+
+    Returns:
+    - dict with the "level", the bin "depth_top"/"depth_base" and, per curve,
+      its "min"/"max" envelope over the window.
+    """
+    depth_start = -np.inf if depth_start is None else depth_start
+    depth_end = np.inf if depth_end is None else depth_end
+    pixels = max(int(pixels), 1)
+
+    for level, (top, base) in enumerate(pyramid["depth"]):
+        start = np.searchsorted(base, depth_start, side="left")
+        end = np.searchsorted(top, depth_end, side="right")
+
+        if end - start <= pixels:
+            break
+
+    if columns is None:
+        columns = list(pyramid["curves"].keys())
+
+    curves = {}
+    for col in columns:
+        if col in pyramid["curves"]:
+            low, high = pyramid["curves"][col]["levels"][level]
+            curves[col] = {"min": low[start:end], "max": high[start:end]}
+
+    return {
+        "level": level,
+        "factor": pyramid["factor"] ** level,
+        "depth_top": top[start:end],
+        "depth_base": base[start:end],
+        "curves": curves,
+    }
@@ -0,0 +1,148 @@
+import time
+import uuid
+import threading
+import contextvars
+
+
+CURRENT_JOB = contextvars.ContextVar("current_job", default=None)
+
+
+class JobCancelled(BaseException):
+    # BaseException, like asyncio.CancelledError, so handlers that turn every
+    # Exception into an HTTP error do not swallow it
+    pass
+
+
+def report_progress(progress, message=None):
+    """
+    Record the progress of the job running in this context.
+
+    Also the cancellation point of a job: raises JobCancelled once the job was
+    cancelled. Does nothing outside a job, so handlers can call it either way.
+    """
+    job = CURRENT_JOB.get()
+    if job is None:
+        return
+
+    job["progress"] = float(min(max(progress, 0.0), 1.0))
+    if message is not None:
+        job["message"] = message
+
+    if job["cancel"].is_set():
+        raise JobCancelled()
+
+
+class JobQueue:
+    """
+    In-process job queue on top of a WorkerPool.
+
+    Jobs run with the pool's concurrency limit and belong to the session that
+    submitted them. Finished, failed and cancelled jobs are kept for `ttl`
+    seconds after they end, then dropped with their results.
+    """
+
+    def __init__(self, pool, ttl=3600):
+        self.pool = pool
+        self.ttl = ttl
+        self.jobs = {}
+        self.lock = threading.Lock()
+
+    def purge(self):
+        now = time.time()
+
+        with self.lock:
+            for job_id in [
+                job_id
+                for job_id, job in self.jobs.items()
+                if job["finished"] is not None and job["finished"] + self.ttl < now
+            ]:
+                del self.jobs[job_id]
+
+    def submit(self, kind, owner, fn, *args, **kwargs):
+        self.purge()
+
+        job = {
+            "id": uuid.uuid4().hex,
+            "kind": kind,
+            "owner": owner,
+            "status": "queued",
+            "progress": 0.0,
+            "message": None,
+            "error": None,
+            "status_code": None,
+            "created": time.time(),
+            "started": None,
+            "finished": None,
+            "result": None,
+            "cancel": threading.Event(),
+        }
+
+        # Published with its future, so cancel never sees a job without one
+        with self.lock:
+            self.jobs[job["id"]] = job
+            job["future"] = self.pool.submit(self.run, job, fn, args, kwargs)
+
+        return job
+
+    def run(self, job, fn, args, kwargs):
+        with self.lock:
+            if job["cancel"].is_set():
+                return
+
+            job["status"] = "running"
+            job["started"] = time.time()
+
+        CURRENT_JOB.set(job)
+
+        try:
+            job["result"] = fn(*args, **kwargs)
+            job["progress"] = 1.0
+            job["status"] = "done"
+        except JobCancelled:
+            job["status"] = "cancelled"
+        except Exception as e:
+            job["status"] = "failed"
+            job["error"] = str(getattr(e, "detail", e))
+            job["status_code"] = getattr(e, "status_code", 500)
+        finally:
+            job["finished"] = time.time()
+
+    def get(self, job_id, owner):
+        self.purge()
+
+        job = self.jobs.get(job_id)
+        return job if job is not None and job["owner"] == owner else None
+
+    def list(self, owner):
+        self.purge()
+
+        return [job for job in list(self.jobs.values()) if job["owner"] == owner]
+
+    def cancel(self, job):
+        """
+        Cancel a job. Queued jobs never start; running jobs stop at their next
+        report_progress call.
+        """
+        with self.lock:
+            job["cancel"].set()
+
+            if job["future"].cancel() or job["status"] == "queued":
+                job["status"] = "cancelled"
+                job["finished"] = time.time()
+
+    @staticmethod
+    def status(job):
+        return {
+            key: job[key]
+            for key in [
+                "id",
+                "kind",
+                "status",
+                "progress",
+                "message",
+                "error",
+                "created",
+                "started",
+                "finished",
+            ]
+        }
@@ -0,0 +1,289 @@
+import os
+import json
+import time
+import sqlite3
+import threading
+import contextlib
+
+import numpy as np
+import pandas as pd
+
+from well_cache import safe_id, replace_with
+
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS wells (
+    well_id TEXT PRIMARY KEY,
+    name TEXT,
+    uwi TEXT,
+    field TEXT,
+    content_hash TEXT,
+    depth_unit TEXT,
+    top REAL,
+    bottom REAL,
+    step REAL,
+    samples INTEGER,
+    metadata TEXT,
+    column_data TEXT,
+    path TEXT,
+    updated REAL
+);
+CREATE TABLE IF NOT EXISTS curves (
+    well_id TEXT NOT NULL,
+    curve TEXT NOT NULL,
+    unit TEXT,
+    derived INTEGER,
+    min REAL,
+    max REAL,
+    mean REAL,
+    p50 REAL,
+    nan_count INTEGER,
+    PRIMARY KEY (well_id, curve)
+);
+CREATE INDEX IF NOT EXISTS curves_by_name ON curves (curve);
+"""
+
+# Statistics of each curve recorded in the index, as curve_statistics names them
+CURVE_STATS = ("min", "max", "mean", "p50", "nan_count")
+
+
+def sql_value(value):
+    # NaN and NumPy scalars as SQLite takes them
+    if value is None or (isinstance(value, float) and np.isnan(value)):
+        return None
+    if isinstance(value, np.generic):
+        return None if np.isnan(value) else value.item()
+
+    return value
+
+
+class ProjectStore:
+    """
+    Wells of a project, one parquet file each, indexed in SQLite.
+
+    Wells are keyed by an id unique to each well, such as the content hash of
+    its LAS file; names are only metadata.
+
+    Each well's frame, raw and derived curves alike, is a parquet file under
+    `root`/wells, where every curve is its own column chunk, so loading a few
+    curves reads only those. The index (`root`/index.sqlite) records each
+    well's header metadata, depth range and column data, and every stored
+    curve with its unit, whether it was derived and its statistics, so wells
+    can be listed and filtered without opening their files. The directories
+    and the index are created on first use.
+    """
+
+    def __init__(self, root="uploads/project"):
+        self.root = root
+        self.lock = threading.Lock()
+        self.create_lock = threading.Lock()
+        self.created = False
+
+    def create(self):
+        # Once per store, so constructing one (as importing the backend does)
+        # writes nothing
+        with self.create_lock:
+            if self.created:
+                return
+
+            os.makedirs(os.path.join(self.root, "wells"), exist_ok=True)
+            db = sqlite3.connect(os.path.join(self.root, "index.sqlite"), timeout=30)
+            try:
+                with db:
+                    db.execute("PRAGMA journal_mode=WAL")
+                    db.executescript(SCHEMA)
+            finally:
+                db.close()
+
+            self.created = True
+
+    @contextlib.contextmanager
+    def index(self):
+        # A connection per call, so any worker thread can use the store;
+        # committed on success, rolled back on error
+        self.create()
+        db = sqlite3.connect(os.path.join(self.root, "index.sqlite"), timeout=30)
+        db.row_factory = sqlite3.Row
+
+        try:
+            with db:
+                yield db
+        finally:
+            db.close()
+
+    def well_path(self, well_id):
+        return os.path.join(self.root, "wells", f"{safe_id(well_id)}.parquet")
+
+    def save(self, well_id, df_las, column_data, metadata=None, stats=None, raw_curves=None):
+        """
+        Write a well's file and replace its index entries.
+
+        Parameters:
+        - well_id: id of the well in the project.
+        - df_las: the well's frame, with any derived curves.
+        - column_data: curve name to {"unit", "limits"}, as the backend keeps it.
+        - metadata: header fields (as scan_las_header returns them) to index.
+          None keeps the metadata already indexed for the well.
+        - stats: curve name to curve_statistics, for the curves to index.
+        - raw_curves: curves read from the LAS file. None keeps the ones
+          already indexed for the well, so saving derived curves later leaves
+          them marked as derived.
+        """
+        stats = stats or {}
+        path = self.well_path(well_id)
+        self.create()
+
+        # Replaced whole, so readers never see a partial file
+        replace_with(path, lambda temp: df_las.to_parquet(temp, engine="pyarrow", index=False))
+
+        depth = df_las["MD"].to_numpy(dtype=float) if "MD" in df_las else np.zeros(0)
+        depth = depth[~np.isnan(depth)]
+
+        with self.lock, self.index() as db:
+            if metadata is None:
+                row = db.execute(
+                    "SELECT metadata FROM wells WHERE well_id = ?", (well_id,)
+                ).fetchone()
+                metadata = json.loads(row["metadata"]) if row else {}
+
+            step = metadata.get("step")
+            if step is None and len(depth) > 1:
+                step = float(np.median(np.diff(depth)))
+
+            if raw_curves is None:
+                raw_curves = [
+                    row["curve"]
+                    for row in db.execute(
+                        "SELECT curve FROM curves WHERE well_id = ? AND derived = 0",
+                        (well_id,),
+                    )
+                ] or list(df_las.columns)
+
+            db.execute("DELETE FROM curves WHERE well_id = ?", (well_id,))
+            db.execute(
+                "INSERT OR REPLACE INTO wells VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (
+                    well_id,
+                    metadata.get("well"),
+                    (metadata.get("location") or {}).get("UWI"),
+                    (metadata.get("location") or {}).get("FLD"),
+                    metadata.get("content_hash"),
+                    metadata.get("depth_unit"),
+                    float(depth.min()) if len(depth) else None,
+                    float(depth.max()) if len(depth) else None,
+                    sql_value(step),
+                    len(df_las),
+                    json.dumps(metadata, default=str),
+                    json.dumps(column_data, default=str),
+                    path,
+                    time.time(),
+                ),
+            )
+            db.executemany(
+                "INSERT INTO curves VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                [
+                    (
+                        well_id,
+                        curve,
+                        column_data.get(curve, {}).get("unit"),
+                        int(curve not in raw_curves),
+                        *(sql_value(stats.get(curve, {}).get(key)) for key in CURVE_STATS),
+                    )
+                    for curve in df_las.columns
+                ],
+            )
+
+    def load(self, well_id, curves=None):
+        """
+        Read a well, or only some of its curves, from its file.
+
+        Parameters:
+        - well_id: id of the well in the project.
+        - curves: curve names to read along with MD; all curves if None.
+          Curves the well does not have are skipped.
+
+        Returns:
+        - (df_las, column_data), or None if the well is not in the project.
+        """
+        well = self.well(well_id)
+        if well is None:
+            return None
+
+        columns = None
+        if curves is not None:
+            stored = [curve["curve"] for curve in well["curves"]]
+            columns = [
+                curve
+                for curve in dict.fromkeys(["MD", *curves])
+                if curve in stored
+            ]
+
+        df_las = pd.read_parquet(well["path"], engine="pyarrow", columns=columns)
+        return df_las, well["column_data"]
+
+    def well(self, well_id):
+        """Index entry of a well with its curves, or None."""
+        with self.index() as db:
+            row = db.execute("SELECT * FROM wells WHERE well_id = ?", (well_id,)).fetchone()
+            if row is None:
+                return None
+
+            well = dict(row)
+            well["curves"] = [
+                dict(curve)
+                for curve in db.execute(
+                    "SELECT * FROM curves WHERE well_id = ? ORDER BY rowid", (well_id,)
+                )
+            ]
+
+        well["metadata"] = json.loads(well["metadata"])
+        well["column_data"] = json.loads(well["column_data"])
+        for value in well["column_data"].values():
+            value["limits"] = tuple(value["limits"]) if value.get("limits") else None
+
+        return well
+
+    def wells(self, curves=None, top=None, bottom=None):
+        """
+        List the wells of the project.
+
+        Parameters:
+        - curves: only wells having all of these curves.
+        - top, bottom: only wells whose depth range overlaps this interval.
+
+        Returns:
+        - the wells' index rows with their curve names, by well id.
+        """
+        query = "SELECT * FROM wells WHERE 1 = 1"
+        args = []
+
+        for curve in curves or []:
+            query += " AND well_id IN (SELECT well_id FROM curves WHERE curve = ?)"
+            args.append(curve)
+        if top is not None:
+            query += " AND bottom >= ?"
+            args.append(top)
+        if bottom is not None:
+            query += " AND top <= ?"
+            args.append(bottom)
+
+        with self.index() as db:
+            wells = [dict(row) for row in db.execute(query + " ORDER BY well_id", args)]
+            names = {}
+            for row in db.execute("SELECT well_id, curve FROM curves ORDER BY rowid"):
+                names.setdefault(row["well_id"], []).append(row["curve"])
+
+        for well in wells:
+            well["metadata"] = json.loads(well["metadata"])
+            well["curves"] = names.get(well["well_id"], [])
+            del well["column_data"]
+
+        return wells
+
+    def delete(self, well_id):
+        with self.lock, self.index() as db:
+            db.execute("DELETE FROM curves WHERE well_id = ?", (well_id,))
+            db.execute("DELETE FROM wells WHERE well_id = ?", (well_id,))
+
+        if os.path.exists(self.well_path(well_id)):
+            os.remove(self.well_path(well_id))
@@ -1,16 +1,36 @@
-from fastapi import FastAPI, File, UploadFile, HTTPException, Form, BackgroundTasks
-from functools import lru_cache
+from fastapi import FastAPI, File, UploadFile, HTTPException, Form, Request
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.middleware.gzip import GZipMiddleware
+from fastapi.responses import JSONResponse, Response
 from typing import Optional
 import numpy as np
-import shutil
 import os
+import matplotlib
+
+# Figures are rendered in worker threads, never shown
+matplotlib.use("Agg")
+
 from feature_log import *
 import io
 import base64
 import json
+import struct
+import asyncio
+import contextvars
+import functools
+import itertools
+from collections import OrderedDict
+import hashlib
+import secrets
+import uuid
+import tempfile
 import logging
+import pyarrow as pa
+from well_cache import WellCache, safe_id
+from worker_pool import WorkerPool
+from job_queue import JobQueue, report_progress
+from upload_store import UploadStore, UploadError
+from project_store import ProjectStore
 
 logging.basicConfig(
     level=logging.DEBUG,  # Set the level to DEBUG to capture detailed info
@@ -20,7 +40,67 @@ logger = logging.getLogger(__name__)
 
 app = FastAPI()
 
-CACHE = {}
+# Wells held per session, spilled to parquet beyond the byte budget
+WELLS = WellCache(max_bytes=int(os.environ.get("WELL_CACHE_BYTES", 2 * 1024**3)))
+CURRENT_WELL = contextvars.ContextVar("current_well", default=("default", None))
+REQUEST_STATE = contextvars.ContextVar("request_state", default=None)
+# Derived curve graph a request updates, published with its frame by save_to_cache
+PENDING_GRAPH = contextvars.ContextVar("pending_graph", default=None)
+
+# Handlers run in COMPUTE so the event loop only does I/O. COMPUTE must be a
+# thread pool since jobs share WELLS; RENDER can also be a process pool.
+COMPUTE = WorkerPool(
+    "compute", workers=int(os.environ.get("COMPUTE_WORKERS", os.cpu_count() or 4))
+)
+RENDER = WorkerPool(
+    "render",
+    workers=int(os.environ.get("RENDER_WORKERS", 1)),
+    kind=os.environ.get("RENDER_POOL", "thread"),
+)
+
+# Long runs submitted with "Prefer: respond-async", kept JOB_TTL seconds once done
+JOBS = JobQueue(
+    WorkerPool("jobs", workers=int(os.environ.get("JOB_WORKERS", 2))),
+    ttl=int(os.environ.get("JOB_TTL", 3600)),
+)
+RESPOND_ASYNC = contextvars.ContextVar("respond_async", default=False)
+CURRENT_REQUEST = contextvars.ContextVar("current_request", default=None)
+
+# Step responses by ETag, least recently used dropped beyond RESPONSE_CACHE_BYTES
+RESPONSE_CACHE = OrderedDict()
+IN_FLIGHT = {}
+RESPONSE_CACHE_BYTES = int(os.environ.get("RESPONSE_CACHE_BYTES", 256 * 1024**2))
+
+# Chunked uploads: UPLOAD_MAX_BYTES per file and UPLOAD_CHUNK_BYTES per chunk.
+# Chunks are written and parsed in UPLOAD_POOL; beyond UPLOAD_QUEUE waiting
+# chunks, clients are told to retry.
+UPLOADS = UploadStore(
+    max_bytes=int(os.environ.get("UPLOAD_MAX_BYTES", 4 * 1024**3)),
+    ttl=int(os.environ.get("UPLOAD_TTL", 86400)),
+    parser=LasStreamParser,
+    block_bytes=LAS_READ_BYTES,
+)
+UPLOAD_CHUNK_BYTES = int(os.environ.get("UPLOAD_CHUNK_BYTES", 64 * 1024**2))
+UPLOAD_POOL = WorkerPool("upload", workers=int(os.environ.get("UPLOAD_WORKERS", 2)))
+UPLOAD_QUEUE = int(os.environ.get("UPLOAD_QUEUE", 8))
+
+# Uploaded files by content hash, never by the client's file name
+RAW_DIR = os.path.join("uploads", "raw")
+
+# Every uploaded well, shared by all sessions, with its SQLite index
+PROJECT = ProjectStore(os.environ.get("PROJECT_DIR", os.path.join("uploads", "project")))
+
+# Directory tree /scan-las/ may inventory, and processes it scans with
+LAS_ARCHIVE_ROOT = os.environ.get("LAS_ARCHIVE_ROOT", "uploads")
+SCAN_WORKERS = int(os.environ.get("SCAN_WORKERS", os.cpu_count() or 1))
+
+# Responses larger than GZIP_MIN_BYTES are gzipped for clients that accept it,
+# at GZIP_LEVEL; a low level keeps the step endpoints' latency down
+app.add_middleware(
+    GZipMiddleware,
+    minimum_size=int(os.environ.get("GZIP_MIN_BYTES", 1024)),
+    compresslevel=int(os.environ.get("GZIP_LEVEL", 1)),
+)
 
 # Add CORS middleware
 app.add_middleware(
@@ -32,6 +112,162 @@ app.add_middleware(
 )
 
 
+@app.middleware("http")
+async def bind_session(request: Request, call_next):
+    # Requests work on the well of their session, or the one named by X-Well-Id
+    session_id = (
+        request.headers.get("x-session-id")
+        or request.cookies.get("session_id")
+        or "default"
+    )
+    CURRENT_WELL.set((session_id, request.headers.get("x-well-id")))
+    REQUEST_STATE.set(None)
+    PENDING_GRAPH.set(None)
+    RESPOND_ASYNC.set("respond-async" in request.headers.get("prefer", ""))
+    CURRENT_REQUEST.set(request)
+
+    return await call_next(request)
+
+
+def offload(handler):
+    """
+    Run a handler in the COMPUTE pool, or as a job when the request carries
+    "Prefer: respond-async". Jobs answer 202 with their status and Location.
+    """
+
+    @functools.wraps(handler)
+    async def endpoint(*args, **kwargs):
+        if RESPOND_ASYNC.get():
+            session_id, _ = CURRENT_WELL.get()
+            job = JOBS.submit(handler.__name__, session_id, handler, *args, **kwargs)
+
+            return JSONResponse(
+                JobQueue.status(job),
+                status_code=202,
+                headers={"Location": f"/jobs/{job['id']}/"},
+            )
+
+        return await COMPUTE.run(handler, *args, **kwargs)
+
+    return endpoint
+
+
+def response_etag(handler, version: int, params: dict):
+    # Identifies the response of a handler for given parameters at a well version
+    request = CURRENT_REQUEST.get()
+    key = json.dumps(
+        [
+            VERSION_EPOCH,
+            well_key(),
+            version,
+            handler.__name__,
+            params,
+            request.headers.get("accept", "") if request else "",
+        ],
+        sort_keys=True,
+        default=str,
+    )
+
+    return '"' + hashlib.blake2b(key.encode(), digest_size=16).hexdigest() + '"'
+
+
+def cache_response(etag: str, response: Response):
+    RESPONSE_CACHE[etag] = response
+    RESPONSE_CACHE.move_to_end(etag)
+
+    while (
+        len(RESPONSE_CACHE) > 1
+        and sum(len(cached.body) for cached in RESPONSE_CACHE.values())
+        > RESPONSE_CACHE_BYTES
+    ):
+        RESPONSE_CACHE.popitem(last=False)
+
+
+def copy_response(response: Response):
+    # Stored and shared responses are sent again as fresh objects
+    return Response(
+        response.body,
+        status_code=response.status_code,
+        media_type=response.media_type,
+        headers={"ETag": response.headers["ETag"]} if "ETag" in response.headers else None,
+    )
+
+
+def exclusive(handler):
+    """
+    Run a handler that writes the well while holding the well's lock.
+
+    Writers therefore apply one after another and none loses another's
+    curves. Readers need no lock: load_data hands out a copy-on-write
+    snapshot and save_to_cache publishes a new state, the derived curve graph
+    with it, in one update. A handler failing before that leaves no trace.
+    """
+
+    @functools.wraps(handler)
+    def run(*args, **kwargs):
+        with WELLS.lock_for(well_key()):
+            return handler(*args, **kwargs)
+
+    return run
+
+
+def memoize(handler):
+    """
+    Serve repeated step requests without compute or serialization.
+
+    A step handler applied with the same parameters to the state it produced
+    leaves that state unchanged and returns the same response, so the response
+    is stored under an ETag of (well, version after the call, handler,
+    parameters, Accept). A later request at that same version with the same
+    parameters gets the stored response, or a bare 304 when it sends the ETag
+    in If-None-Match. Any change to the well's curves bumps its version and so
+    invalidates every stored response of the well.
+
+    Identical requests arriving while one is computing wait for it and share
+    its response instead of running the pipeline again.
+    """
+
+    @functools.wraps(handler)
+    async def endpoint(*args, **kwargs):
+        if RESPOND_ASYNC.get():
+            return await handler(*args, **kwargs)
+
+        request = CURRENT_REQUEST.get()
+        params = {key: value for key, value in kwargs.items() if key != "request"}
+        version = WELLS.state(well_key()).get("version")
+
+        if version is None:
+            return await handler(*args, **kwargs)
+
+        etag = response_etag(handler, version, params)
+
+        if request is not None and request.headers.get("if-none-match") == etag:
+            return Response(status_code=304, headers={"ETag": etag})
+
+        if etag in RESPONSE_CACHE:
+            RESPONSE_CACHE.move_to_end(etag)
+            return copy_response(RESPONSE_CACHE[etag])
+
+        if etag in IN_FLIGHT:
+            # Shielded so a disconnecting client does not cancel the others' work
+            return copy_response(await asyncio.shield(IN_FLIGHT[etag]))
+
+        flight = asyncio.ensure_future(handler(*args, **kwargs))
+        IN_FLIGHT[etag] = flight
+        flight.add_done_callback(lambda _: IN_FLIGHT.pop(etag, None))
+
+        response = await asyncio.shield(flight)
+        version = WELLS.state(well_key()).get("version")
+
+        if response.status_code == 200 and "ETag" not in response.headers:
+            response.headers["ETag"] = response_etag(handler, version, params)
+            cache_response(response.headers["ETag"], response)
+
+        return copy_response(response)
+
+    return endpoint
+
+
 def plot_to_base64(fig):
     buf = io.BytesIO()
     fig.savefig(buf, format="png")
@@ -39,6 +275,158 @@ def plot_to_base64(fig):
     return base64.b64encode(buf.getvalue()).decode("utf-8")
 
 
+def render_plot(plot_function, *args, **kwargs):
+    # Runs in the RENDER pool: draw, encode and release the figure
+    fig = plot_function(*args, **kwargs)
+
+    try:
+        return plot_to_base64(fig)
+    finally:
+        plt.close(fig)
+
+
+ARROW_STREAM = "application/vnd.apache.arrow.stream"
+FLOAT32_FRAME = "application/x-float32-frame"
+
+
+def json_safe(payload):
+    # NaN/inf are not valid JSON, so send them as null
+    return json.loads(json.dumps(payload, default=str), parse_constant=lambda x: None)
+
+
+def frame_to_arrow(df: pd.DataFrame, payload: dict):
+    """
+    Serialize a frame as an Arrow IPC stream straight from its NumPy columns.
+
+    NaN becomes null through the validity bitmap and the other response fields
+    travel as JSON in the schema metadata under "payload".
+    """
+    arrays = [
+        pa.array(df[column].to_numpy(), from_pandas=True) for column in df.columns
+    ]
+    table = pa.Table.from_arrays(
+        arrays,
+        names=[str(column) for column in df.columns],
+        metadata={"payload": json.dumps(json_safe(payload))},
+    )
+
+    sink = pa.BufferOutputStream()
+    with pa.ipc.new_stream(sink, table.schema) as writer:
+        writer.write_table(table)
+
+    return sink.getvalue().to_pybytes()
+
+
+def frame_to_float32(df: pd.DataFrame, payload: dict):
+    """
+    Serialize a frame as little-endian float32 buffers with validity bitmaps.
+
+    Layout: uint32 LE header length, a JSON header padded to 8 bytes, then the
+    body. The header lists every numeric column with the body offsets of its
+    LSB-first validity bitmap (1 = value present) and its float32 values, both
+    8-byte aligned. Non-numeric columns (WELL) are sent as lists in "strings".
+    """
+    columns = []
+    strings = {}
+    buffers = []
+    offset = 0
+
+    def append(buffer):
+        nonlocal offset
+        start = offset
+        buffers.append(buffer)
+        offset += len(buffer)
+        padding = -offset % 8
+        buffers.append(b"\0" * padding)
+        offset += padding
+        return start
+
+    for column in df.columns:
+        if not pd.api.types.is_numeric_dtype(df[column]):
+            strings[str(column)] = df[column].astype(str).tolist()
+            continue
+
+        values = df[column].to_numpy(dtype="<f4")
+        validity = np.packbits(~np.isnan(values), bitorder="little")
+        columns.append(
+            {
+                "name": str(column),
+                "validity_offset": append(validity.tobytes()),
+                "offset": append(values.tobytes()),
+            }
+        )
+
+    header = json.dumps(
+        {
+            "length": len(df),
+            "columns": columns,
+            "strings": strings,
+            "payload": json_safe(payload),
+        }
+    ).encode("utf-8")
+    header += b" " * (-(len(header) + 4) % 8)
+
+    return struct.pack("<I", len(header)) + header + b"".join(buffers)
+
+
+def frame_response(
+    request: Request,
+    df: pd.DataFrame,
+    payload: dict,
+    columns: Optional[str] = None,
+    since_version: Optional[str] = None,
+):
+    """
+    Return the frame of a step endpoint in the format asked for by Accept.
+
+    Parameters:
+    - columns: comma separated curve names to return; all curves if not given.
+    - since_version: version token from an earlier response. Only curves changed
+      after it are returned, with the curves dropped since then in "removed".
+      An unknown or stale token returns every curve.
+    """
+    cache = session_cache()
+    if "version" not in cache:
+        cache.update(version_entries(cache, df))
+    cache = dict(cache)
+
+    payload = {**payload, "version": version_token(cache["version"])}
+    selected = list(df.columns)
+
+    if columns:
+        requested = [column.strip() for column in columns.split(",")]
+        selected = [column for column in requested if column in df.columns]
+
+    since = parse_version_token(cache, since_version)
+    if since is not None:
+        versions = cache["column_versions"]
+        selected = [column for column in selected if versions.get(column, since + 1) > since]
+        payload["removed"] = [
+            column
+            for column, version in cache["dropped_columns"].items()
+            if version > since
+        ]
+
+    return negotiate_frame(request, df[selected], payload)
+
+
+def negotiate_frame(request: Request, df: pd.DataFrame, payload: dict):
+    # Content negotiation for the step endpoints; JSON stays the default
+    accept = request.headers.get("accept", "")
+
+    if ARROW_STREAM in accept:
+        return Response(frame_to_arrow(df, payload), media_type=ARROW_STREAM)
+    if FLOAT32_FRAME in accept:
+        return Response(frame_to_float32(df, payload), media_type=FLOAT32_FRAME)
+
+    df_las_json = {}
+
+    for column in df.columns:
+        df_las_json[column] = df[column].tolist()
+
+    return JSONResponse({"df_las": json_safe(df_las_json), **payload})
+
+
 def get_dropdown_dict_vcl(df: pd.DataFrame):
     col_list = [col for col in df.columns if col.startswith("VCL") and col != "VCL"]
 
@@ -92,6 +480,13 @@ def get_dropdown_dict_phi(df: pd.DataFrame):
             column_mappings.append(
                 {"value": "neutron_density", "text": "Neutron-Density"}
             )
+        elif col == "PHIxNDgc":
+            column_mappings.append(
+                {
+                    "value": "neutron_density_gas_corr",
+                    "text": "Neutron-Density Gas Correction",
+                }
+            )
 
     return column_mappings
 
@@ -112,36 +507,179 @@ def get_dropdown_dict_sw(df: pd.DataFrame):
     return column_mappings
 
 
-def save_to_disk(df_las: pd.DataFrame, column_data: dict):
-    df_las.to_parquet("uploads/df_las.parquet", engine="pyarrow")
+def parse_float_list(values: str):
+    return [float(value) for value in values.replace(";", ",").split(",") if value.strip()]
+
+
+def well_key():
+    return WELLS.key(*CURRENT_WELL.get())
+
+
+def session_cache():
+    # State of the well the current request works on, looked up once per request
+    key = well_key()
+    memo = REQUEST_STATE.get()
+
+    if memo is None or memo[0] != key or "df_las" not in memo[1]:
+        memo = (key, WELLS.get(*key))
+        REQUEST_STATE.set(memo)
+
+    return memo[1]
 
+
+def column_data_frame(column_data: dict):
     df = pd.DataFrame(column_data).T
     df["limits"] = df["limits"].apply(lambda x: list(x))
 
-    df.to_parquet("uploads/column_data.parquet", engine="pyarrow")
+    return df
+
+
+def save_to_disk(df_las: pd.DataFrame, column_data: dict):
+    WELLS.save(well_key(), df_las, column_data_frame(column_data))
 
 
 def save_to_cache(df_las: pd.DataFrame, column_data: dict):
-    CACHE["df_las"] = df_las
+    key = well_key()
+    cache = WELLS.state(key)
+    df = column_data_frame(column_data)
+
+    # Built aside and published in one update, so readers see old or new state
+    entries = {"df_las": df_las, "column_data": df}
+    entries.update(version_entries(cache, df_las))
+    entries.update(pyramid_entries(cache, df_las, entries["column_versions"]))
+    entries.update(stats_entries(cache, entries["column_versions"]))
+
+    # The graph goes with the frame holding its curves, never without it
+    pending = PENDING_GRAPH.get()
+    if pending is not None and pending[0] == key:
+        entries["graph"] = pending[1]
+        PENDING_GRAPH.set(None)
+
+    cache.update(entries)
+    WELLS.update(key)
+
+
+# Random per process so tokens handed out before a restart are never trusted.
+# Versions are unique across wells, so a new upload never reuses one.
+VERSION_EPOCH = secrets.token_hex(4)
+VERSION_COUNTER = itertools.count(1)
+
+
+def version_token(version: int):
+    return f"{VERSION_EPOCH}-{version}"
+
+
+def parse_version_token(cache: dict, token: Optional[str]):
+    if not token:
+        return None
+
+    epoch, _, version = token.partition("-")
+    if epoch != VERSION_EPOCH or not version.isdigit():
+        return None
+
+    version = int(version)
+    return version if version <= cache["version"] else None
+
+
+def version_entries(cache: dict, df_las: pd.DataFrame):
+    """
+    Version bookkeeping of the cache after saving df_las, as new entries.
+
+    Every curve whose content changed gets a new version. A curve still held in
+    the buffer of the cached frame is unchanged without being read; one that
+    was replaced is compared by curve_fingerprint with the curve it replaces,
+    so recomputing a curve with the same parameters does not count as a
+    change. Curves that disappeared from the frame are kept in
+    "dropped_columns" with the version they were dropped at.
+
+    These versions are the only change tracking of a well: the depth pyramid,
+    curve statistics and derived curve graph are all keyed by them.
+    """
+    previous = cache.get("df_las")
+    versions = dict(cache.get("column_versions", {}))
+    fingerprints = dict(cache.get("column_fingerprints", {}))
+    dropped = dict(cache.get("dropped_columns", {}))
+    version = next(VERSION_COUNTER)
+    changed = "version" not in cache
+
+    for column in df_las.columns:
+        if column in versions and previous is not None and column in previous.columns:
+            if column_identity(previous[column]) == column_identity(df_las[column]):
+                continue
+
+            # Fingerprints are taken only once a curve is replaced
+            before = fingerprints.get(column) or curve_fingerprint(previous[column])
+            fingerprints[column] = curve_fingerprint(df_las[column])
+            if fingerprints[column] == before:
+                continue
+        else:
+            fingerprints.pop(column, None)
+
+        versions[column] = version
+        dropped.pop(column, None)
+        changed = True
+
+    for column in [column for column in versions if column not in df_las.columns]:
+        del versions[column]
+        fingerprints.pop(column, None)
+        dropped[column] = version
+        changed = True
+
+    return {
+        "column_versions": versions,
+        "column_fingerprints": fingerprints,
+        "dropped_columns": dropped,
+        "version": version if changed else cache["version"],
+    }
+
+
+def stats_entries(cache: dict, versions: dict):
+    # Curve statistics stay only for the curves whose version did not change
+    store = cache.get("curve_stats", new_curve_stats())
+
+    return {
+        "curve_stats": {
+            "curves": {
+                col: entry
+                for col, entry in store["curves"].items()
+                if entry[0] == versions.get(col)
+            },
+            "correlations": {
+                pair: entry
+                for pair, entry in store["correlations"].items()
+                if entry[0] == tuple(versions.get(col) for col in pair)
+            },
+        }
+    }
 
-    df = pd.DataFrame(column_data).T
-    df["limits"] = df["limits"].apply(lambda x: list(x))
 
-    CACHE["column_data"] = df
+def pyramid_entries(cache: dict, df_las: pd.DataFrame, versions: Optional[dict]):
+    # Rebuilds only the curves whose version changed since the last call
+    if "MD" not in df_las.columns:
+        return {}
 
+    return {"pyramid": depth_pyramid(df_las, pyramid=cache.get("pyramid"), versions=versions)}
 
-def dict_from_parquet():
-    loaded_df = pd.read_parquet("uploads/column_data.parquet", engine="pyarrow")
-    loaded_dict = loaded_df.to_dict(orient="index")
 
-    for _, value in loaded_dict.items():
-        value["limits"] = tuple(value["limits"])
+def add_cutoff_column_data(df: pd.DataFrame, column_data: dict):
+    # Units and plot limits of the curves added by the SW and cutoff stages
+    for i in df.columns:
+        if (i not in list(column_data.keys())) and i.lower().startswith("sw"):
+            column_data[i] = {"unit": "V/V", "limits": (0, 1)}
+    
+    for i in df.columns:
+        if (i not in list(column_data.keys())) and ("perm" in i.lower()):
+            column_data[i] = {"unit": "MD", "limits": (0, 1000)}
 
-    return loaded_dict
+    column_data["BVW"] = {"unit": "dec", "limits": (0, 1)}
+    column_data["MATRIX"] = {"unit": "dec", "limits": (0, 1)}
 
 
-def dict_from_cache():
-    loaded_df = CACHE["column_data"]
+def dict_from_cache(cache: dict):
+    return column_data_dict(cache["column_data"])
+
+
+def column_data_dict(loaded_df: pd.DataFrame):
     loaded_dict = loaded_df.to_dict(orient="index")
 
     for _, value in loaded_dict.items():
@@ -150,66 +688,666 @@ def dict_from_cache():
     return loaded_dict
 
 
+def curve_graph():
+    # Copy of the parameters and keys of the derived curves held in the well's
+    # "df_las", for the request to update; save_to_cache publishes it
+    key = well_key()
+    pending = PENDING_GRAPH.get()
+
+    if pending is None or pending[0] != key:
+        graph = session_cache().get("graph") or new_curve_graph()
+        pending = (key, {part: dict(entries) for part, entries in graph.items()})
+        PENDING_GRAPH.set(pending)
+
+    return pending[1]
+
+
 def load_data():
-    if "df_las" in CACHE:
-        df = CACHE["df_las"]
-    else:
-        df = pd.read_parquet("uploads/df_las.parquet", engine="pyarrow")
-    
-    if "column_data" in CACHE:
-        dict_ = dict_from_cache()
-    else:
-        dict_ = dict_from_parquet()
-        
-    return df, dict_
+    cache = session_cache()
+
+    if "df_las" not in cache:
+        raise HTTPException(status_code=404, detail="No well uploaded for this session")
+
+    if "version" not in cache:
+        cache.update(version_entries(cache, cache["df_las"]))
+
+    # Shallow copy-on-write snapshot: handlers add curves to it, never to the
+    # frame other requests are reading
+    df_las = cache["df_las"].copy(deep=False)
+    bind_curve_stats(
+        df_las, cache["column_versions"], cache.setdefault("curve_stats", new_curve_stats())
+    )
+
+    return df_las, dict_from_cache(cache)
 
 @app.post("/upload-file/")
-async def upload_file(file: UploadFile = File(...)):
+@COMPUTE.offload
+def upload_file(file: UploadFile = File(...)):
+    os.makedirs(RAW_DIR, exist_ok=True)
+    buffer = tempfile.NamedTemporaryFile(dir=RAW_DIR, delete=False)
+    new_file = None
+
     try:
-        os.makedirs("uploads", exist_ok=True)
+        # Save uploaded file under its content hash, computed while copying
+        digest = hashlib.sha256()
+        with buffer:
+            for block in iter(functools.partial(file.file.read, LAS_READ_BYTES), b""):
+                digest.update(block)
+                buffer.write(block)
+
+        file_path = os.path.join(RAW_DIR, digest.hexdigest() + ".las")
+        if not os.path.exists(file_path):
+            new_file = file_path
+        os.replace(buffer.name, file_path)
+
+        response = register_well(
+            file.filename, digest.hexdigest(), lambda: read_las(file_path)
+        )
+        new_file = None
 
-        # Save uploaded file
-        file_path = os.path.join("uploads", file.filename)
-        with open(file_path, "wb") as buffer:
-            shutil.copyfileobj(file.file, buffer)
+        return response
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+    finally:
+        # Neither a partial copy nor a file first sent by a failed upload is kept
+        for path in (buffer.name, new_file):
+            if path is not None and os.path.exists(path):
+                os.remove(path)
+
+
+def well_column_data(df_las: pd.DataFrame, curve_data: dict, curve_stats: Optional[dict] = None):
+    # One pass over every curve, reused later by the default model endpoints
+    if curve_stats is None:
+        curve_stats = well_statistics(df_las)["curves"]
+
+    dict_test = {
+        i: (curve_stats[i]["min"], curve_stats[i]["max"])
+        for i in list(curve_data.keys())
+        if i in curve_stats
+    }
+    column_data = {
+        key: {"unit": curve_data.get(key), "limits": dict_test.get(key)}
+        for key in curve_data.keys()
+    }
+    
+    limit_mapping = {
+        "GR": (0, 200),
+        "SP": (-125, 125),
+        "RHOB": (1.95, 2.95),
+        "NPHI": (-0.15, 0.45),
+        "RDEEP": (0.2, 2000),
+        "RMED": (0.2, 2000),
+        "RSHAL": (0.2, 2000),
+    }
+
+    for key, limits in limit_mapping.items():
+        if key in column_data:
+            column_data[key]["limits"] = limits
+
+    for i in ["VCL", "PHI", "PHIE", "SW"]:
+        column_data[i] = {"unit": "V/V", "limits": (0, 1)}
+
+    return column_data
+
+
+def open_well(df_las: pd.DataFrame, column_data: dict, digest: Optional[str] = None):
+    # Fills the state of the current well and makes it the session's active well.
+    # With a digest, the well adopts the project's file of that upload, which
+    # must hold exactly df_las.
+    session_id, well_id = CURRENT_WELL.get()
+
+    # The session switches to the new well only once it is complete
+    with WELLS.lock_for((session_id, well_id)):
+        WELLS.new(session_id, well_id)
+        if digest is not None:
+            WELLS.adopt(
+                (session_id, well_id),
+                PROJECT.well_path(digest),
+                column_data_frame(column_data),
+            )
+        else:
+            save_to_disk(df_las, column_data)
+        save_to_cache(df_las, column_data)
+        WELLS.activate(session_id, well_id)
+
+
+def seed_curve_stats(cache: dict, statistics: dict):
+    # well_statistics of the frame just saved, stored under its curves' versions
+    versions = cache["column_versions"]
+    store = cache.setdefault("curve_stats", new_curve_stats())
+
+    for col, stats in statistics["curves"].items():
+        store["curves"][col] = (versions[col], stats)
+    for pair, correlation in statistics["correlations"].items():
+        pair = tuple(pair.split(":"))
+        store["correlations"][pair] = (tuple(versions[col] for col in pair), correlation)
+
+
+def register_well(filename: str, digest: str, read=None):
+    """
+    Make an uploaded well the session's active well.
+
+    Uploads are stored once, in the project, keyed by content hash: a file
+    seen before is loaded from there without reading it; anything else is
+    read once and saved to the project.
+
+    Parameters:
+    - filename: name of the uploaded file, which names the well.
+    - digest: SHA-256 hex digest of the file.
+    - read: function returning (df_las, curve_data) like read_las.
+
+    Returns:
+    - the upload response with the session and well ids.
+    """
+    session_id, _ = CURRENT_WELL.get()
+    well_id = safe_id(os.path.splitext(filename)[0])
+    CURRENT_WELL.set((session_id, well_id))
+
+    # Concurrent uploads of the same content parse it once
+    with WELLS.store_lock(digest):
+        stored = PROJECT.well(digest)
+        statistics = None
+        derived = []
+
+        if stored is not None:
+            # Curves derived and saved to the project since are left out
+            derived = [curve["curve"] for curve in stored["curves"] if curve["derived"]]
+            df_las, column_data = PROJECT.load(digest)
+            df_las = df_las.drop(columns=derived)
+            column_data = {
+                col: value for col, value in column_data.items() if col not in derived
+            }
+        else:
+            df_las, curve_data = read()
+            statistics = well_statistics(df_las)
+            column_data = well_column_data(df_las, curve_data, statistics["curves"])
+
+            # The project has one entry per file content, keyed by its hash with
+            # the file name as metadata, so other content uploaded under the
+            # same name never replaces it
+            header = scan_las_header(os.path.join(RAW_DIR, f"{digest}.las"))
+            PROJECT.save(
+                digest,
+                df_las,
+                column_data,
+                metadata={
+                    **{
+                        key: value
+                        for key, value in header.items()
+                        if key not in ("path", "curves")
+                    },
+                    "content_hash": digest,
+                    "file_name": os.path.basename(filename),
+                },
+                stats=statistics["curves"],
+                raw_curves=list(df_las.columns),
+            )
+
+    # The project file is adopted as is unless it has derived curves too
+    open_well(df_las, column_data, None if derived else digest)
+    WELLS.record_upload(session_id, digest)
+    WELLS.state((session_id, well_id))["project_id"] = digest
 
-        df_las, curve_data = read_lasio(file_path)
+    # Statistics computed while parsing are kept with the well; a deduplicated
+    # upload computes each curve's when first used
+    if statistics is not None:
+        seed_curve_stats(WELLS.state((session_id, well_id)), statistics)
 
-        dict_test = {
-            i: (df_las[i].min(), df_las[i].max()) for i in list(curve_data.keys())
+    return JSONResponse(
+        {
+            "session_id": session_id,
+            "well_id": well_id,
+            "project_id": digest,
+            "content_hash": digest,
+            "deduplicated": stored is not None,
+            "message": "File uploaded successfully",
         }
-        column_data = {
-            key: {"unit": curve_data.get(key), "limits": dict_test.get(key)}
-            for key in curve_data.keys()
+    )
+
+
+def session_upload(upload_id: str):
+    session_id, _ = CURRENT_WELL.get()
+    upload = UPLOADS.get(upload_id, session_id)
+
+    if upload is None:
+        raise HTTPException(status_code=404, detail="Upload not found or expired")
+
+    return upload
+
+
+def upload_error(upload: dict, e: UploadError):
+    # Upload-Offset tells the client where to resume
+    return HTTPException(
+        status_code=e.status_code,
+        detail=e.detail,
+        headers={"Upload-Offset": str(upload["offset"])} if upload else None,
+    )
+
+
+@app.post("/uploads/")
+async def create_upload(
+    filename: str = Form(...),
+    size: Optional[int] = Form(None),
+    sha256: Optional[str] = Form(None),
+):
+    """
+    Start a chunked upload. Chunks then go to PUT /uploads/{id}/ in order,
+    each with its offset and SHA-256; GET /uploads/{id}/ gives the offset to
+    resume from, and POST /uploads/{id}/complete/ reads the well.
+
+    When the SHA-256 of the whole file is given and this session uploaded that
+    content before, the well is registered right away and nothing has to be
+    sent. Content uploaded only by other sessions has to be sent again.
+    """
+    session_id, _ = CURRENT_WELL.get()
+
+    digest = sha256.lower() if sha256 else None
+    if digest and WELLS.uploaded(session_id, digest) and PROJECT.well(digest) is not None:
+        return await COMPUTE.run(register_well, filename, digest)
+
+    try:
+        upload = UPLOADS.create(session_id, filename, size)
+    except UploadError as e:
+        raise upload_error(None, e)
+
+    return JSONResponse(
+        {**UploadStore.status(upload), "chunk_bytes": UPLOAD_CHUNK_BYTES},
+        status_code=201,
+        headers={"Location": f"/uploads/{upload['id']}/"},
+    )
+
+
+@app.get("/uploads/{upload_id}/")
+async def get_upload(upload_id: str):
+    return JSONResponse(UploadStore.status(session_upload(upload_id)))
+
+
+@app.put("/uploads/{upload_id}/")
+async def upload_chunk(
+    upload_id: str,
+    offset: int = Form(...),
+    checksum: str = Form(...),
+    chunk: UploadFile = File(...),
+):
+    upload = session_upload(upload_id)
+
+    if chunk.size is not None and chunk.size > UPLOAD_CHUNK_BYTES:
+        raise HTTPException(
+            status_code=413, detail=f"Chunks are limited to {UPLOAD_CHUNK_BYTES} bytes"
+        )
+
+    # Backpressure: a client waits for each chunk to be written and parsed, and
+    # is asked to retry rather than queueing chunks without bound
+    if UPLOAD_POOL.stats()["queue_depth"] >= UPLOAD_QUEUE:
+        raise HTTPException(
+            status_code=503,
+            detail="Too many chunks waiting, retry later",
+            headers={"Retry-After": "1"},
+        )
+
+    data = await chunk.read()
+
+    try:
+        upload = await UPLOAD_POOL.run(UPLOADS.write, upload, offset, data, checksum)
+    except UploadError as e:
+        raise upload_error(upload, e)
+
+    return JSONResponse(UploadStore.status(upload))
+
+
+@app.post("/uploads/{upload_id}/complete/")
+@offload
+def complete_upload(upload_id: str):
+    upload = session_upload(upload_id)
+
+    try:
+        file_path, digest, parser = UPLOADS.finish(upload, RAW_DIR)
+
+        def read():
+            # The data was parsed as it arrived; only unsupported files are read again
+            if parser is None:
+                return read_lasio(file_path)
+
+            try:
+                return parser.close()
+            except ValueError:
+                return read_lasio(file_path)
+
+        return register_well(upload["filename"], digest, read)
+    except UploadError as e:
+        raise upload_error(upload, e)
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@app.delete("/uploads/{upload_id}/")
+async def delete_upload(upload_id: str):
+    UPLOADS.discard(session_upload(upload_id))
+    return JSONResponse({"message": "Upload discarded"})
+
+
+def project_well(well_id: str):
+    well = PROJECT.well(well_id)
+
+    if well is None:
+        raise HTTPException(status_code=404, detail="Well not found in the project")
+
+    return well
+
+
+@app.get("/project/wells/")
+@COMPUTE.offload
+def list_project_wells(
+    curves: Optional[str] = None,
+    top: Optional[float] = None,
+    bottom: Optional[float] = None,
+):
+    """
+    List the project's wells from its index, optionally only those having all
+    the given curves or overlapping the top-bottom depth interval.
+    """
+    wells = PROJECT.wells(
+        curves=[curve.strip() for curve in curves.split(",")] if curves else None,
+        top=top,
+        bottom=bottom,
+    )
+
+    return JSONResponse(json_safe(wells))
+
+
+@app.get("/project/wells/{well_id}/")
+@COMPUTE.offload
+def get_project_well(well_id: str):
+    # Index entry with every curve's unit, origin and statistics
+    return JSONResponse(json_safe(project_well(well_id)))
+
+
+@app.get("/project/wells/{well_id}/curves/")
+@COMPUTE.offload
+def get_project_curves(request: Request, well_id: str, curves: Optional[str] = None):
+    """
+    Curves of a project well, reading only their columns from its file. The
+    format follows Accept like the step endpoints.
+    """
+    project_well(well_id)
+
+    df_las, _ = PROJECT.load(
+        well_id, [curve.strip() for curve in curves.split(",")] if curves else None
+    )
+
+    return negotiate_frame(
+        request,
+        df_las.select_dtypes("number"),
+        {"well_id": well_id, "message": "Curves loaded successfully"},
+    )
+
+
+@app.post("/project/wells/")
+@offload
+def save_project_well():
+    """
+    Save the session's current well to the project, with its derived curves,
+    under the project entry it was uploaded or loaded as. A well with no entry
+    yet gets a new one, named after the session's well.
+    """
+    df_las, column_data = load_data()
+    _, well_id = well_key()
+
+    cache = session_cache()
+    if "project_id" not in cache:
+        cache["project_id"] = uuid.uuid4().hex
+        metadata = {"file_name": well_id}
+    else:
+        metadata = None
+
+    # Not while an upload of the same content is reading or adopting the file
+    with WELLS.store_lock(cache["project_id"]):
+        PROJECT.save(
+            cache["project_id"],
+            df_las,
+            column_data,
+            metadata=metadata,
+            stats=well_statistics(df_las)["curves"],
+        )
+
+    return JSONResponse(
+        {
+            "well_id": well_id,
+            "project_id": cache["project_id"],
+            "message": "Well saved to the project successfully",
         }
-        
-        limit_mapping = {
-            "GR": (0, 200),
-            "SP": (-125, 125),
-            "RHOB": (1.95, 2.95),
-            "NPHI": (-0.15, 0.45),
-            "RDEEP": (0.2, 2000),
-            "RMED": (0.2, 2000),
-            "RSHAL": (0.2, 2000),
+    )
+
+
+@app.post("/project/wells/{well_id}/load/")
+@offload
+def load_project_well(well_id: str):
+    # Makes a project well the session's active well, derived curves included,
+    # named after its file like an upload
+    well = project_well(well_id)
+    df_las, column_data = PROJECT.load(well_id)
+
+    session_id, _ = CURRENT_WELL.get()
+    session_well = safe_id(os.path.splitext(well["metadata"].get("file_name") or well_id)[0])
+    CURRENT_WELL.set((session_id, session_well))
+    open_well(df_las, column_data)
+    WELLS.state((session_id, session_well))["project_id"] = well_id
+
+    return JSONResponse(
+        {
+            "session_id": session_id,
+            "well_id": session_well,
+            "project_id": well_id,
+            "message": "Well loaded successfully",
+        }
+    )
+
+
+@app.delete("/project/wells/{well_id}/")
+@COMPUTE.offload
+def delete_project_well(well_id: str):
+    project_well(well_id)
+    PROJECT.delete(well_id)
+
+    return JSONResponse({"message": "Well deleted from the project"})
+
+
+@app.post("/scan-las/")
+@offload
+def scan_las(directory: Optional[str] = Form(".")):
+    """
+    Inventory the LAS files under a directory of LAS_ARCHIVE_ROOT from their
+    headers, without reading any data section.
+    """
+    root = os.path.realpath(LAS_ARCHIVE_ROOT)
+    path = os.path.realpath(os.path.join(root, directory))
+
+    if os.path.commonpath([root, path]) != root:
+        raise HTTPException(status_code=400, detail="Directory is outside the archive")
+    if not os.path.isdir(path):
+        raise HTTPException(status_code=404, detail="Directory not found")
+
+    try:
+        inventory = scan_las_directory(
+            path,
+            workers=SCAN_WORKERS,
+            progress=lambda done: report_progress(done, "Scanning headers"),
+        )
+        inventory["path"] = [os.path.relpath(file, root) for file in inventory["path"]]
+
+        return JSONResponse(
+            json_safe(
+                {
+                    "files": inventory.to_dict(orient="records"),
+                    "failed": int(inventory["error"].notna().sum()),
+                }
+            )
+        )
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error occurred: {str(e)}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@app.get("/cache-stats/")
+async def get_cache_stats():
+    return JSONResponse(WELLS.stats())
+
+
+@app.get("/worker-stats/")
+async def get_worker_stats():
+    return JSONResponse(
+        {
+            "compute": COMPUTE.stats(),
+            "render": RENDER.stats(),
+            "jobs": JOBS.pool.stats(),
+            "upload": UPLOAD_POOL.stats(),
         }
+    )
 
-        for key, limits in limit_mapping.items():
-            if key in column_data:
-                column_data[key]["limits"] = limits
 
-        for i in ["VCL", "PHI", "PHIE", "SW"]:
-            column_data[i] = {"unit": "V/V", "limits": (0, 1)}
-        
-        save_to_disk(df_las, column_data)
-        save_to_cache(df_las, column_data)
+def session_job(job_id: str):
+    session_id, _ = CURRENT_WELL.get()
+    job = JOBS.get(job_id, session_id)
+
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found or expired")
+
+    return job
+
+
+@app.get("/jobs/")
+async def list_jobs():
+    session_id, _ = CURRENT_WELL.get()
+    return JSONResponse([JobQueue.status(job) for job in JOBS.list(session_id)])
+
+
+@app.get("/jobs/{job_id}/")
+async def get_job(job_id: str):
+    return JSONResponse(JobQueue.status(session_job(job_id)))
+
+
+@app.get("/jobs/{job_id}/result/")
+async def get_job_result(job_id: str):
+    job = session_job(job_id)
+
+    if job["status"] == "done":
+        return job["result"]
+    if job["status"] == "failed":
+        raise HTTPException(status_code=job["status_code"], detail=job["error"])
+    if job["status"] == "cancelled":
+        raise HTTPException(status_code=410, detail="Job was cancelled")
+
+    return JSONResponse(JobQueue.status(job), status_code=202)
 
+
+@app.delete("/jobs/{job_id}/")
+async def cancel_job(job_id: str):
+    job = session_job(job_id)
+    JOBS.cancel(job)
+
+    return JSONResponse(JobQueue.status(job))
+
+
+@app.post("/depth-window/")
+@offload
+def get_depth_window(
+    depth_start: Optional[float] = Form(None),
+    depth_end: Optional[float] = Form(None),
+    pixels: Optional[int] = Form(1000),
+    columns: Optional[str] = Form(None),
+):
+    try:
+        cache = session_cache()
+        if "pyramid" not in cache:
+            df_las, _ = load_data()
+            cache.update(pyramid_entries(cache, df_las, cache.get("column_versions")))
+            WELLS.update(well_key())
+
+        window = pyramid_window(
+            cache["pyramid"],
+            depth_start=depth_start,
+            depth_end=depth_end,
+            pixels=pixels,
+            columns=[col.strip() for col in columns.split(",")] if columns else None,
+        )
+
+        window_json = {
+            "level": window["level"],
+            "factor": window["factor"],
+            "depth_top": window["depth_top"].tolist(),
+            "depth_base": window["depth_base"].tolist(),
+            "curves": {
+                col: {"min": curve["min"].tolist(), "max": curve["max"].tolist()}
+                for col, curve in window["curves"].items()
+            },
+        }
+
+        return JSONResponse(
+            {
+                **json.loads(json.dumps(window_json), parse_constant=lambda x: None),
+                "message": "Depth window generated successfully",
+            }
+        )
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error occurred: {str(e)}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@app.post("/curve-statistics/")
+@offload
+def get_curve_statistics():
+    try:
+        df_las, _ = load_data()
+
+        stats = well_statistics(df_las)
+
+        stats_json = {
+            "curves": {
+                col: {
+                    **{
+                        key: float(value)
+                        for key, value in curve.items()
+                        if key != "histogram"
+                    },
+                    "histogram": {
+                        "counts": curve["histogram"]["counts"].tolist(),
+                        "edges": curve["histogram"]["edges"].tolist(),
+                    },
+                }
+                for col, curve in stats["curves"].items()
+            },
+            "correlations": stats["correlations"],
+        }
+
+        return JSONResponse(
+            {
+                **json.loads(json.dumps(stats_json), parse_constant=lambda x: None),
+                "message": "Curve statistics generated successfully",
+            }
+        )
+    except HTTPException:
+        raise
     except Exception as e:
+        logger.error(f"Error occurred: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
 
 
 @app.post("/process-combo-plot/")
-async def process_combo_plot(
+@memoize
+@offload
+def process_combo_plot(
+    request: Request,
     figure_height: Optional[int] = Form(30),
+    columns: Optional[str] = Form(None),
+    since_version: Optional[str] = Form(None),
 ):
     try:
 
@@ -224,26 +1362,30 @@ async def process_combo_plot(
 
         # plt.close(combo_plot_img)
         
-        df_las_json = {}
-
-        for column in df_las.columns:
-            df_las_json[column] = df_las[column].tolist()
-
-        return JSONResponse(
+        return frame_response(
+            request,
+            df_las,
             {
-                "df_las": json.loads(json.dumps(df_las_json), parse_constant=lambda x: None),
                 "column_data": column_data,
                 # "combo_plot": combo_plot_base64,
                 "message": "Combo plot generated successfully",
-            }
+            },
+            columns=columns,
+            since_version=since_version,
         )
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Error occurred: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
 
 
 @app.post("/process-vcl-plot/")
-async def process_vcl_plot(
+@memoize
+@offload
+@exclusive
+def process_vcl_plot(
+    request: Request,
     gr_clean: Optional[float] = Form(None),
     gr_clay: Optional[float] = Form(None),
     sp_clean: Optional[float] = Form(None),
@@ -257,25 +1399,32 @@ async def process_vcl_plot(
     den_clean2: Optional[float] = Form(None),
     den_clay: Optional[float] = Form(None),
     correction_gr: Optional[str] = Form("young"),
+    columns: Optional[str] = Form(None),
+    since_version: Optional[str] = Form(None),
 ):
     try:
         df_las, column_data = load_data()
 
-        df_las = calc_vcl(
+        df_las, _ = update_derived_curves(
             df_las,
-            gr_clean,
-            gr_clay,
-            sp_clean,
-            sp_clay,
-            rt_clean,
-            rt_clay,
-            neut_clean1,
-            den_clean1,
-            neut_clean2,
-            den_clean2,
-            neut_clay,
-            den_clay,
-            correction_gr,
+            curve_graph(),
+            {
+                "vcl_models": {
+                    "gr_clean": gr_clean,
+                    "gr_clay": gr_clay,
+                    "sp_clean": sp_clean,
+                    "sp_clay": sp_clay,
+                    "rt_clean": rt_clean,
+                    "rt_clay": rt_clay,
+                    "neut_clean1": neut_clean1,
+                    "den_clean1": den_clean1,
+                    "neut_clean2": neut_clean2,
+                    "den_clean2": den_clean2,
+                    "neut_clay": neut_clay,
+                    "den_clay": den_clay,
+                    "correction_gr": correction_gr,
+                }
+            },
         )
 
         dropdown_vcl = get_dropdown_dict_vcl(df_las)
@@ -295,28 +1444,32 @@ async def process_vcl_plot(
 
         # plt.close(vcl_plot_img)
         
-        df_las_json = {}
-
-        for column in df_las.columns:
-            df_las_json[column] = df_las[column].tolist()
-
         save_to_cache(df_las, column_data)
 
-        return JSONResponse(
+        return frame_response(
+            request,
+            df_las,
             {
-                "df_las": json.loads(json.dumps(df_las_json), parse_constant=lambda x: None),
                 "column_data": column_data,
                 "dropdown_vcl": json.dumps(dropdown_vcl, indent=4),
                 # "vcl_plot": vcl_plot_base64,
                 "message": "VCL plot generated successfully",
-            }
+            },
+            columns=columns,
+            since_version=since_version,
         )
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
 @app.post("/process-phi-plot/")
-async def process_phi_plot(
+@memoize
+@offload
+@exclusive
+def process_phi_plot(
+    request: Request,
     dt_ma: Optional[float] = Form(None),
     dt_fl: Optional[float] = Form(None),
     dt_sh: Optional[float] = Form(None),
@@ -326,24 +1479,30 @@ async def process_phi_plot(
     neut_sh: Optional[float] = Form(None),
     cp: Optional[float] = Form(0.67),
     alpha: Optional[float] = Form(1),
-    vcl_select: Optional[str] = Form("gr")
+    vcl_select: Optional[str] = Form("gr"),
+    columns: Optional[str] = Form(None),
+    since_version: Optional[str] = Form(None),
 ):
     try:
         df_las, column_data = load_data()
         
-        df_las = select_vcl(df_las, vcl_select)
-
-        df_las = calc_phi(
+        df_las, _ = update_derived_curves(
             df_las,
-            dt_ma=dt_ma,
-            dt_fl=dt_fl,
-            dt_sh=dt_sh,
-            den_ma=den_ma,
-            den_fl=den_fl,
-            den_sh=den_sh,
-            neut_sh=neut_sh,
-            cp=cp,
-            alpha=alpha,
+            curve_graph(),
+            {
+                "vcl": {"select_vcl": vcl_select},
+                "phi_models": {
+                    "dt_ma": dt_ma,
+                    "dt_fl": dt_fl,
+                    "dt_sh": dt_sh,
+                    "den_ma": den_ma,
+                    "den_fl": den_fl,
+                    "den_sh": den_sh,
+                    "neut_sh": neut_sh,
+                    "cp": cp,
+                    "alpha": alpha,
+                },
+            },
         )
 
         dropdown_phi = get_dropdown_dict_phi(df_las)
@@ -358,35 +1517,42 @@ async def process_phi_plot(
 
         # plt.close(phi_plot_img)
         
-        df_las_json = {}
-
-        for column in df_las.columns:
-            df_las_json[column] = df_las[column].tolist()
-
         save_to_cache(df_las, column_data)
 
-        return JSONResponse(
+        return frame_response(
+            request,
+            df_las,
             {
-                "df_las": json.loads(json.dumps(df_las_json), parse_constant=lambda x: None),
                 "column_data": column_data,
                 "dropdown_phi": json.dumps(dropdown_phi, indent=4),
                 # "phi_plot": phi_plot_base64,
                 "message": "PHI plot generated successfully",
-            }
+            },
+            columns=columns,
+            since_version=since_version,
         )
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Error occurred: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
 
 
 @app.post("/process-pickett-plot/")
-async def process_pickett_plot(
+@memoize
+@offload
+@exclusive
+def process_pickett_plot(
     phi_select: Optional[str] = Form("neutron_density")
 ):
     try:
-        df_las, _ = load_data()
-        
-        df_las = select_phi(df_las, phi_select)
+        df_las, column_data = load_data()
+
+        df_las, _ = update_derived_curves(
+            df_las, curve_graph(), {"phie": {"select_phi": phi_select}}
+        )
+
+        save_to_cache(df_las, column_data)
 
         ### Pickett Plot Image using Python (deprecated) ###
         # pickett_plot_img = pickett_plot(df_las, vcl_limit, rw, a, m, n, z_ax)
@@ -401,13 +1567,19 @@ async def process_pickett_plot(
                 "message": "Pickett plot generated successfully",
             }
         )
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Error occurred: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
 
 
 @app.post("/process-sw-plot/")
-async def process_sw_plot(
+@memoize
+@offload
+@exclusive
+def process_sw_plot(
+    request: Request,
     rw: Optional[float] = Form(0.08),
     rsh: Optional[float] = Form(None),
     a: Optional[float] = Form(1),
@@ -417,24 +1589,42 @@ async def process_sw_plot(
     mid_perf_bht: Optional[float] = Form(210),
     surface_temp: Optional[float] = Form(60),
     phi_select: Optional[str] = Form("neutron_density"),
+    waxman_tol: Optional[float] = Form(0.01),
+    waxman_max_iter: Optional[int] = Form(100),
+    columns: Optional[str] = Form(None),
+    since_version: Optional[str] = Form(None),
 ):
     try:
         df_las, column_data = load_data()
+        report_progress(0.1, "Computing saturation models")
         
-        df_las = select_phi(df_las, phi_select)
-
-        df_las = calc_sw(
+        df_las, _ = update_derived_curves(
             df_las,
-            rw=rw,
-            a=a,
-            m=m,
-            n=n,
-            mid_perf_md=mid_perf_md,
-            mid_perf_bht=mid_perf_bht,
-            surface_temp=surface_temp,
-            rsh=rsh,
+            curve_graph(),
+            {
+                "phie": {"select_phi": phi_select},
+                "sw_models": {
+                    "rw": rw,
+                    "a": a,
+                    "m": m,
+                    "n": n,
+                    "mid_perf_md": mid_perf_md,
+                    "mid_perf_bht": mid_perf_bht,
+                    "surface_temp": surface_temp,
+                    "rsh": rsh,
+                    "waxman_tol": waxman_tol,
+                    "waxman_max_iter": waxman_max_iter,
+                },
+            },
         )
 
+        waxman_unconverged = df_las.attrs.get("SWwaxman_unconverged", 0)
+        report_progress(0.9, "Saving results")
+        if waxman_unconverged:
+            logger.warning(
+                f"Waxman-Smits did not converge for {waxman_unconverged} samples"
+            )
+
         dropdown_sw = get_dropdown_dict_sw(df_las)
 
         ### SW Plot Image using Python (deprecated) ###
@@ -447,96 +1637,299 @@ async def process_sw_plot(
 
         # plt.close(sw_plot_img)
         
-        df_las_json = {}
-
-        for column in df_las.columns:
-            df_las_json[column] = df_las[column].tolist()
-        
         save_to_cache(df_las, column_data)
 
-        return JSONResponse(
+        return frame_response(
+            request,
+            df_las,
             {
-                "df_las": json.loads(json.dumps(df_las_json), parse_constant=lambda x: None),
                 "column_data": column_data,
                 "dropdown_sw": json.dumps(dropdown_sw, indent=4),
+                "waxman_unconverged": waxman_unconverged,
                 # "sw_plot": sw_plot_base64,
                 "message": "SW plot generated successfully",
-            }
+            },
+            columns=columns,
+            since_version=since_version,
         )
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Error occurred: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.post("/process-cutoff-plot/")
-async def process_cut_off(
+@memoize
+@offload
+@exclusive
+def process_cut_off(
+    request: Request,
     sw_cutoff: Optional[float] = Form(0.8),  
     phi_cutoff: Optional[float] = Form(0.2),
     vcl_cutoff: Optional[float] = Form(0.2),
     sw_select: Optional[str] = Form("archie"),
+    columns: Optional[str] = Form(None),
+    since_version: Optional[str] = Form(None),
 ):
     
     df_las, column_data = load_data()
+    report_progress(0.1, "Computing cutoff curves")
     
-    df_las_select = select_sw(df_las, sw_select)
-
-    for i in df_las_select.columns:
-        if (i not in list(column_data.keys())) and i.lower().startswith("sw"):
-            column_data[i] = {"unit": "V/V", "limits": (0, 1)}
-    
-    df_las_select["BVW"] = df_las_select["SW"] * df_las_select["PHIE"]
-    df_las_select["MATRIX"] = 1 - df_las_select["VCL"] - df_las_select["PHIE"] 
-    
-    df_las_select["PERM"] = perm_timur(df_las_select["PHIE"], df_las_select["SW"])
-    
-    for i in df_las_select.columns:
-        if (i not in list(column_data.keys())) and ("perm" in i.lower()):
-            column_data[i] = {"unit": "MD", "limits": (0, 1000)}
-
-    column_data["BVW"] = {"unit": "dec", "limits": (0, 1)}
-    column_data["MATRIX"] = {"unit": "dec", "limits": (0, 1)}
-    
-    cutoff_plot_img = plot_with_cutoffs(df_las_select, sw_cutoff, vcl_cutoff, phi_cutoff)
-    
-    cutoff_plot_base64 = plot_to_base64(cutoff_plot_img)
+    df_las_select, _ = update_derived_curves(
+        df_las, curve_graph(), {"sw": {"select_sw": sw_select}, "cutoff": {}}
+    )
 
-    plt.close(cutoff_plot_img)
+    add_cutoff_column_data(df_las_select, column_data)
     
-    df_las_json = {}
-
-    for column in df_las_select.columns:
-        df_las_json[column] = df_las_select[column].tolist()
+    report_progress(0.5, "Rendering cutoff plot")
+    cutoff_plot_base64 = RENDER.call(
+        render_plot, plot_with_cutoffs, df_las_select, sw_cutoff, vcl_cutoff, phi_cutoff
+    )
     
     save_to_cache(df_las_select, column_data)
     
-    return JSONResponse(
+    return frame_response(
+        request,
+        df_las_select,
         {
-            "df_las": json.loads(json.dumps(df_las_json), parse_constant=lambda x: None),
             "column_data": column_data,
             "cutoff_plot": cutoff_plot_base64,
             "message": "Cutoff plot generated successfully",
-        }
+        },
+        columns=columns,
+        since_version=since_version,
     )
 
+@app.post("/process-cutoff-sensitivity/")
+@offload
+def process_cutoff_sensitivity(
+    sw_cutoffs: str = Form(...),
+    phi_cutoffs: str = Form(...),
+    vcl_cutoffs: str = Form(...),
+    depth_start: Optional[float] = Form(None),
+    depth_end: Optional[float] = Form(None),
+):
+    try:
+        df_las, _ = load_data()
+
+        cube = cutoff_sensitivity(
+            df_las,
+            parse_float_list(sw_cutoffs),
+            parse_float_list(phi_cutoffs),
+            parse_float_list(vcl_cutoffs),
+            depth_start=depth_start,
+            depth_end=depth_end,
+        )
+
+        cube_json = {key: value.tolist() for key, value in cube.items()}
+
+        return JSONResponse(
+            {
+                **json.loads(json.dumps(cube_json), parse_constant=lambda x: None),
+                "message": "Cutoff sensitivity generated successfully",
+            }
+        )
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error occurred: {str(e)}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.post("/process-parameter-sweep/")
+@offload
+def process_parameter_sweep(
+    rw: Optional[str] = Form(None),
+    a: Optional[str] = Form(None),
+    m: Optional[str] = Form(None),
+    n: Optional[str] = Form(None),
+    rsh: Optional[str] = Form(None),
+    dt_ma: Optional[str] = Form(None),
+    dt_fl: Optional[str] = Form(None),
+    dt_sh: Optional[str] = Form(None),
+    den_ma: Optional[str] = Form(None),
+    den_fl: Optional[str] = Form(None),
+    den_sh: Optional[str] = Form(None),
+    neut_sh: Optional[str] = Form(None),
+    cp: Optional[str] = Form(None),
+    alpha: Optional[str] = Form(None),
+    grid: Optional[bool] = Form(True),
+    phi_select: Optional[str] = Form("neutron_density"),
+    sw_select: Optional[str] = Form("archie"),
+    sw_cutoff: Optional[float] = Form(0.8),
+    phi_cutoff: Optional[float] = Form(0.2),
+    vcl_cutoff: Optional[float] = Form(0.2),
+    depth_start: Optional[float] = Form(None),
+    depth_end: Optional[float] = Form(None),
+    return_curves: Optional[str] = Form(None),
+):
+    try:
+        df_las, _ = load_data()
+
+        form_values = {
+            "rw": rw,
+            "a": a,
+            "m": m,
+            "n": n,
+            "rsh": rsh,
+            "dt_ma": dt_ma,
+            "dt_fl": dt_fl,
+            "dt_sh": dt_sh,
+            "den_ma": den_ma,
+            "den_fl": den_fl,
+            "den_sh": den_sh,
+            "neut_sh": neut_sh,
+            "cp": cp,
+            "alpha": alpha,
+        }
+        params = {
+            key: parse_float_list(value)
+            for key, value in form_values.items()
+            if value is not None
+        }
+
+        if grid:
+            params = parameter_grid(**params)
+
+        sweep = parameter_sweep(
+            df_las,
+            params,
+            phi_select=phi_select,
+            sw_select=sw_select,
+            sw_cutoff=sw_cutoff,
+            phi_cutoff=phi_cutoff,
+            vcl_cutoff=vcl_cutoff,
+            depth_start=depth_start,
+            depth_end=depth_end,
+            return_curves=[
+                int(index) for index in parse_float_list(return_curves or "")
+            ],
+            progress=lambda done: report_progress(done * 0.9, "Evaluating parameter sets"),
+            phi_defaults=PIPELINE_DEFAULTS["phi_models"],
+        )
+
+        sweep_json = {
+            "params": {key: value.tolist() for key, value in sweep["params"].items()},
+            "mean_sw": sweep["mean_sw"].tolist(),
+            "net_pay": sweep["net_pay"].tolist(),
+            "hcpv": sweep["hcpv"].tolist(),
+            "curves": {
+                str(index): {key: value.tolist() for key, value in curves.items()}
+                for index, curves in sweep["curves"].items()
+            },
+        }
+
+        return JSONResponse(
+            {
+                **json.loads(json.dumps(sweep_json), parse_constant=lambda x: None),
+                "message": "Parameter sweep generated successfully",
+            }
+        )
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error occurred: {str(e)}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.post("/process-monte-carlo/")
+@offload
+def process_monte_carlo(
+    distributions: str = Form(...),
+    realizations: Optional[int] = Form(1000),
+    seed: Optional[int] = Form(None),
+    workers: Optional[int] = Form(None),
+    vcl_select: Optional[str] = Form("gr"),
+    phi_select: Optional[str] = Form("neutron_density"),
+    sw_select: Optional[str] = Form("archie"),
+    correction_gr: Optional[str] = Form("young"),
+    depth_start: Optional[float] = Form(None),
+    depth_end: Optional[float] = Form(None),
+):
+    try:
+        df_las, _ = load_data()
+
+        result = monte_carlo(
+            df_las,
+            json.loads(distributions),
+            realizations=realizations,
+            seed=seed,
+            workers=workers,
+            vcl_select=vcl_select,
+            phi_select=phi_select,
+            sw_select=sw_select,
+            correction_gr=correction_gr,
+            depth_start=depth_start,
+            depth_end=depth_end,
+            progress=lambda done: report_progress(done * 0.9, "Running realizations"),
+        )
+
+        result_json = {
+            "params": {key: value.tolist() for key, value in result["params"].items()},
+            "net_pay": result["net_pay"].tolist(),
+            "hcpv": result["hcpv"].tolist(),
+            "mean_sw": result["mean_sw"].tolist(),
+            "summary": {
+                key: {level: float(value) for level, value in levels.items()}
+                for key, levels in result["summary"].items()
+            },
+            "MD": result["MD"].tolist(),
+            "net_pay_probability": result["net_pay_probability"].tolist(),
+            "curves": {
+                curve: {level: values.tolist() for level, values in levels.items()}
+                for curve, levels in result["curves"].items()
+            },
+        }
+
+        return JSONResponse(
+            {
+                **json.loads(json.dumps(result_json), parse_constant=lambda x: None),
+                "message": "Monte Carlo generated successfully",
+            }
+        )
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error occurred: {str(e)}")
+        raise HTTPException(status_code=500, detail=str(e))
+
 @app.post("/process-interpretation-plot/")
-async def process_interpretation_plot(
+@memoize
+@offload
+@exclusive
+def process_interpretation_plot(
     sw_cutoff: Optional[float] = Form(0.8),  
     phi_cutoff: Optional[float] = Form(0.2),
     vcl_cutoff: Optional[float] = Form(0.2),
+    min_thickness: Optional[float] = Form(0),
+    merge_gap: Optional[float] = Form(0),
 ):
     df_las, column_data = load_data()
+    report_progress(0.1, "Computing net pay")
     
-    df_with_netpay, net_pay_intervals = calculate_net_pay(
-        df_las, sw_cutoff, phi_cutoff, vcl_cutoff
+    graph = curve_graph()
+    df_with_netpay, _ = update_derived_curves(
+        df_las,
+        graph,
+        {
+            "net_pay": {
+                "sw_cutoff": sw_cutoff,
+                "vcl_cutoff": vcl_cutoff,
+                "phi_cutoff": phi_cutoff,
+                "min_thickness": min_thickness,
+                "merge_gap": merge_gap,
+            }
+        },
     )
+    net_pay_intervals = graph["outputs"]["net_pay"]
     
-    interpretation_plot_img = interpretation_plot(
-        df_with_netpay, column_data=column_data, net_pay_intervals=net_pay_intervals
+    report_progress(0.5, "Rendering interpretation plot")
+    interpretation_plot_base64 = RENDER.call(
+        render_plot,
+        interpretation_plot,
+        df_with_netpay,
+        column_data=column_data,
+        net_pay_intervals=net_pay_intervals,
     )
     
-    interpretation_plot_base64 = plot_to_base64(interpretation_plot_img)
-    
-    plt.close(interpretation_plot_img)
-    
     save_to_disk(df_las, column_data)
     save_to_cache(df_las, column_data)
     
@@ -547,6 +1940,74 @@ async def process_interpretation_plot(
         }
     )
 
+@app.post("/process-pipeline/")
+@memoize
+@offload
+@exclusive
+def process_pipeline(
+    request: Request,
+    params: Optional[str] = Form("{}"),
+    curves: Optional[str] = Form(None),
+    outputs: Optional[str] = Form("curves,intervals,summary"),
+    oil_viscosity: Optional[float] = Form(1),
+    oil_fvf: Optional[float] = Form(1.2),
+):
+    """
+    Run every stage from VCL to net pay in one request.
+
+    params is a JSON object of stage or node name to its arguments, as run_pipeline
+    takes it. outputs picks what is returned from curves, intervals, summary
+    and plot; curves narrows the returned curves. The curves honour Accept like
+    the step endpoints, and the well state is saved as if each step had run.
+    """
+    try:
+        outputs = {output.strip() for output in outputs.split(",")}
+        df_las, column_data = load_data()
+        report_progress(0.1, "Running pipeline")
+
+        df_las, result = run_pipeline(
+            df_las,
+            json.loads(params),
+            graph=curve_graph(),
+            curves=[col.strip() for col in curves.split(",")] if curves else None,
+            oil_viscosity=oil_viscosity,
+            oil_fvf=oil_fvf,
+        )
+        add_cutoff_column_data(df_las, column_data)
+
+        payload = {
+            "recomputed": result["recomputed"],
+            "message": "Pipeline processed successfully",
+        }
+        if "intervals" in outputs:
+            payload["intervals"] = result["intervals"]
+        if "summary" in outputs:
+            payload["summary"] = result["summary"].to_dict(orient="records")
+        if "plot" in outputs:
+            report_progress(0.5, "Rendering interpretation plot")
+            payload["interpretation_plot"] = RENDER.call(
+                render_plot,
+                interpretation_plot,
+                df_las,
+                column_data=column_data,
+                net_pay_intervals=result["intervals"],
+            )
+
+        report_progress(0.9, "Saving results")
+        save_to_cache(df_las, column_data)
+
+        if "curves" not in outputs:
+            return JSONResponse(json_safe(payload))
+
+        frame = pd.DataFrame({"MD": df_las["MD"].to_numpy(), **result["curves"]})
+        return frame_response(request, frame, payload)
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error occurred: {str(e)}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+
 if __name__ == "__main__":
     import uvicorn
 
@@ -0,0 +1,43 @@
+import os
+
+import numpy as np
+from fastapi.testclient import TestClient
+
+import python_backend
+from project_store import ProjectStore
+
+LAS_PATH = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+    "uploads",
+    "Cinta_H-01_LogComposite.las",
+)
+
+
+def test_step_failing_before_save_is_recomputed(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(python_backend, "PROJECT", ProjectStore(str(tmp_path / "project")))
+    client = TestClient(python_backend.app, headers={"x-session-id": "failed-save"})
+
+    with open(LAS_PATH, "rb") as f:
+        response = client.post("/upload-file/", files={"file": ("well.las", f.read())})
+    assert response.status_code == 200
+
+    def sw_archie(rw):
+        response = client.post("/process-sw-plot/", data={"rw": rw, "columns": "SWarchie"})
+        assert response.status_code == 200
+        return np.array(response.json()["df_las"]["SWarchie"], dtype=float)
+
+    before = sw_archie(0.08)
+
+    # The curves are computed with rw=0.03, but never published
+    def fail(*args, **kwargs):
+        raise RuntimeError("save failed")
+
+    with monkeypatch.context() as patch:
+        patch.setattr(python_backend, "save_to_cache", fail)
+        response = client.post("/process-sw-plot/", data={"rw": 0.03, "columns": "SWarchie"})
+        assert response.status_code == 500
+
+    # Archie with n=2 scales with the square root of rw
+    after = sw_archie(0.03)
+    np.testing.assert_allclose(after, before * np.sqrt(0.03 / 0.08), equal_nan=True)
@@ -0,0 +1,86 @@
+import lasio
+import pytest
+
+from feature_log import scan_las_header
+
+
+LAS_12 = """\
+~VERSION INFORMATION
+ VERS.                          1.2:   CWLS LOG ASCII STANDARD -VERSION 1.2
+ WRAP.                          NO:   ONE LINE PER DEPTH STEP
+~WELL INFORMATION BLOCK
+#MNEM.UNIT       DATA TYPE    INFORMATION
+#---------    -------------   ------------------------------
+ STRT.M        1670.000000:
+ STOP.M        1669.750000:
+ STEP.M            -0.1250:
+ NULL.           -999.2500:
+ COMP.             COMPANY:   ANY OIL COMPANY LTD.
+ WELL.                WELL:   ANY ET AL OIL WELL #12
+ FLD .               FIELD:   EDAM
+ LOC .            LOCATION:   A9-16-49-20W3M
+ PROV.            PROVINCE:   SASKATCHEWAN
+ SRVC.     SERVICE COMPANY:   ANY LOGGING COMPANY LTD.
+ DATE.            LOG DATE:   25-DEC-1988
+ UWI .      UNIQUE WELL ID:   100091604920W300
+~CURVE INFORMATION
+ DEPT.M                      :   1  DEPTH
+ DT  .US/M                   :   2  SONIC TRANSIT TIME
+ RHOB.K/M3                   :   3  BULK DENSITY
+ NPHI.V/V                    :   4  NEUTRON POROSITY
+~PARAMETER INFORMATION
+ BHT .DEGC            35.5000:   BOTTOM HOLE TEMPERATURE
+~A  DEPTH     DT       RHOB     NPHI
+1670.000   123.450 2550.000    0.450
+1669.875   123.450 2550.000    0.450
+1669.750   123.450 2550.000    0.450
+"""
+
+LAS_20 = (
+    LAS_12.replace("1.2:   CWLS LOG ASCII STANDARD -VERSION 1.2", "2.0:   CWLS LOG ASCII STANDARD")
+    .replace(" COMP.             COMPANY:   ANY OIL COMPANY LTD.", " COMP.  ANY OIL COMPANY LTD.:   COMPANY")
+    .replace(" WELL.                WELL:   ANY ET AL OIL WELL #12", " WELL.  ANY ET AL OIL WELL #12:   WELL")
+    .replace(" UWI .      UNIQUE WELL ID:   100091604920W300", " UWI .  100091604920W300:   UNIQUE WELL ID")
+)
+
+
+@pytest.fixture
+def las_file(tmp_path):
+    def write(text):
+        path = tmp_path / "well.las"
+        path.write_text(text)
+        return str(path)
+
+    return write
+
+
+def test_las_12_reads_well_fields_from_description(las_file):
+    path = las_file(LAS_12)
+    header = scan_las_header(path)
+    las = lasio.read(path)
+
+    assert header["error"] is None
+    assert header["version"] == "1.2"
+    assert header["well"] == "ANY ET AL OIL WELL #12" == las.well["WELL"].value
+    for mnemonic in ("COMP", "FLD", "LOC", "PROV", "UWI"):
+        assert header["location"][mnemonic] == str(las.well[mnemonic].value)
+    assert header["location"]["COMP"] == "ANY OIL COMPANY LTD."
+
+
+def test_las_12_keeps_depth_fields_in_value(las_file):
+    header = scan_las_header(las_file(LAS_12))
+
+    assert (header["start"], header["stop"], header["step"]) == (1670.0, 1669.75, -0.125)
+    assert header["null"] == -999.25
+    assert header["depth_unit"] == "M"
+    assert [curve["mnemonic"] for curve in header["curves"]] == ["DEPT", "DT", "RHOB", "NPHI"]
+
+
+def test_las_20_reads_well_fields_from_value(las_file):
+    header = scan_las_header(las_file(LAS_20))
+
+    assert header["version"] == "2.0"
+    assert header["well"] == "ANY ET AL OIL WELL #12"
+    assert header["location"]["COMP"] == "ANY OIL COMPANY LTD."
+    assert header["location"]["UWI"] == "100091604920W300"
+    assert header["start"] == 1670.0
@@ -0,0 +1,211 @@
+import os
+import re
+import json
+import time
+import uuid
+import hashlib
+import threading
+
+
+class UploadError(Exception):
+    # Carries the HTTP status the backend answers with
+    def __init__(self, status_code, detail):
+        super().__init__(detail)
+        self.status_code = status_code
+        self.detail = detail
+
+
+class UploadStore:
+    """
+    Resumable uploads written chunk by chunk under `root`.
+
+    Each upload is a part file plus a small JSON record, so an interrupted
+    transfer resumes from the bytes already on disk, even after a restart.
+    Chunks must arrive in order at the upload's current offset and carry the
+    SHA-256 of their bytes; the SHA-256 of the whole file is computed as they
+    arrive and names the file once complete. When a `parser` factory is given,
+    every upload feeds its bytes to a parser as well; a parser that raises
+    ValueError is dropped and the file is parsed once complete instead.
+    Bytes missed by the hash and parser, as after a restart, are read back
+    `block_bytes` at a time. Uploads idle for `ttl` seconds are deleted.
+    """
+
+    def __init__(
+        self,
+        root="uploads/partial",
+        max_bytes=4 * 1024**3,
+        ttl=86400,
+        parser=None,
+        block_bytes=4 * 1024**2,
+    ):
+        self.root = root
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.parser = parser
+        self.block_bytes = block_bytes
+        self.uploads = {}
+        self.lock = threading.RLock()
+
+    def path(self, upload_id, suffix):
+        return os.path.join(self.root, f"{upload_id}.{suffix}")
+
+    def purge(self):
+        # By the part file's mtime, so uploads left by a previous run expire too
+        if not os.path.isdir(self.root):
+            return
+
+        now = time.time()
+
+        with self.lock:
+            for name in os.listdir(self.root):
+                upload_id, suffix = os.path.splitext(name)
+                path = os.path.join(self.root, name)
+                if suffix == ".part" and os.path.getmtime(path) + self.ttl < now:
+                    self.discard({"id": upload_id})
+
+    def create(self, owner, filename, size=None):
+        self.purge()
+
+        if size is not None and size > self.max_bytes:
+            raise UploadError(413, f"Uploads are limited to {self.max_bytes} bytes")
+
+        upload = {
+            "id": uuid.uuid4().hex,
+            "owner": owner,
+            "filename": os.path.basename(filename),
+            "size": size,
+        }
+
+        os.makedirs(self.root, exist_ok=True)
+        with open(self.path(upload["id"], "json"), "w") as f:
+            json.dump(upload, f)
+        open(self.path(upload["id"], "part"), "wb").close()
+
+        return self.restore(upload)
+
+    def restore(self, record):
+        # In-memory state of an upload from its record and the bytes on disk
+        upload = {
+            **record,
+            "offset": os.path.getsize(self.path(record["id"], "part")),
+            "seen": 0,
+            "digest": hashlib.sha256(),
+            "parser": self.parser() if self.parser else None,
+            "lock": threading.Lock(),
+        }
+
+        with self.lock:
+            self.uploads[upload["id"]] = upload
+
+        return upload
+
+    def get(self, upload_id, owner):
+        self.purge()
+
+        if not re.fullmatch(r"[0-9a-f]{32}", upload_id):
+            return None
+
+        with self.lock:
+            upload = self.uploads.get(upload_id)
+            if upload is None and os.path.exists(self.path(upload_id, "json")):
+                with open(self.path(upload_id, "json")) as f:
+                    upload = self.restore(json.load(f))
+
+        return upload if upload is not None and upload["owner"] == owner else None
+
+    def write(self, upload, offset, data, checksum):
+        """
+        Append a chunk at `offset` and feed it to the upload's hash and parser.
+
+        Raises UploadError for a chunk at the wrong offset (409), with a
+        checksum that does not match (422) or beyond the size limit (413).
+        """
+        with upload["lock"]:
+            if offset != upload["offset"]:
+                raise UploadError(409, f"Expected offset {upload['offset']}, got {offset}")
+            if hashlib.sha256(data).hexdigest() != checksum.strip().lower():
+                raise UploadError(422, "Chunk checksum mismatch")
+
+            end = offset + len(data)
+            if end > self.max_bytes or (upload["size"] is not None and end > upload["size"]):
+                raise UploadError(413, "Chunk goes past the upload size")
+
+            # Overwrites whatever an interrupted write left past the offset
+            with open(self.path(upload["id"], "part"), "r+b") as f:
+                f.seek(offset)
+                f.write(data)
+                f.truncate()
+
+            upload["offset"] = end
+            self.feed(upload, data)
+
+            return upload
+
+    def feed(self, upload, data=b""):
+        # Brings hash and parser up to the offset, reading back what they missed
+        if upload["seen"] + len(data) != upload["offset"]:
+            # A block at a time, however much was missed
+            with open(self.path(upload["id"], "part"), "rb") as f:
+                f.seek(upload["seen"])
+                while upload["seen"] < upload["offset"]:
+                    block = f.read(min(self.block_bytes, upload["offset"] - upload["seen"]))
+                    if not block:
+                        break
+                    self.consume(upload, block)
+            return
+
+        self.consume(upload, data)
+
+    def consume(self, upload, data):
+        upload["digest"].update(data)
+        upload["seen"] += len(data)
+
+        if upload["parser"] is not None:
+            try:
+                upload["parser"].feed(data)
+            except ValueError:
+                upload["parser"] = None
+
+    def finish(self, upload, directory):
+        """
+        Move a complete upload into `directory`, named by its SHA-256.
+
+        Returns:
+        - (path, SHA-256 hex digest, parser fed with every byte or None).
+        """
+        with upload["lock"]:
+            if upload["size"] is not None and upload["offset"] != upload["size"]:
+                raise UploadError(
+                    409, f"Upload incomplete: {upload['offset']} of {upload['size']} bytes"
+                )
+
+            self.feed(upload)
+            digest = upload["digest"].hexdigest()
+            path = os.path.join(directory, f"{digest}.las")
+
+            os.makedirs(directory, exist_ok=True)
+            os.replace(self.path(upload["id"], "part"), path)
+            os.remove(self.path(upload["id"], "json"))
+
+            with self.lock:
+                self.uploads.pop(upload["id"], None)
+
+            return path, digest, upload["parser"]
+
+    def discard(self, upload):
+        with self.lock:
+            self.uploads.pop(upload["id"], None)
+
+            for suffix in ("part", "json"):
+                if os.path.exists(self.path(upload["id"], suffix)):
+                    os.remove(self.path(upload["id"], suffix))
+
+    @staticmethod
+    def status(upload):
+        return {
+            "id": upload["id"],
+            "filename": upload["filename"],
+            "size": upload["size"],
+            "offset": upload["offset"],
+            "parsing": upload["parser"] is not None,
+        }
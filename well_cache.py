@@ -0,0 +1,338 @@
+import os
+import re
+import shutil
+import hashlib
+import tempfile
+import functools
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+
+# State entries that hold the well's arrays; everything else is small metadata
+RESIDENT_KEYS = ("df_las", "column_data", "pyramid")
+
+
+def safe_id(value: str):
+    # Ids end up in paths, so anything unusual is replaced by its hash
+    if re.fullmatch(r"[A-Za-z0-9_.-]{1,64}", value) and value not in (".", ".."):
+        return value
+
+    return hashlib.blake2b(value.encode(), digest_size=8).hexdigest()
+
+
+def temp_path(path):
+    # A fresh name next to `path` for writing it whole, unique to each writer
+    fd, temp = tempfile.mkstemp(
+        dir=os.path.dirname(path), prefix=os.path.basename(path) + ".", suffix=".tmp"
+    )
+    os.close(fd)
+    return temp
+
+
+def replace_with(path, write):
+    # Writes a temporary file with write(temp) and moves it over `path`
+    temp = temp_path(path)
+    try:
+        write(temp)
+        os.replace(temp, path)
+    except BaseException:
+        if os.path.exists(temp):
+            os.remove(temp)
+        raise
+
+
+def link_or_copy(source, path):
+    os.remove(path)
+    try:
+        os.link(source, path)
+    except OSError:
+        shutil.copyfile(source, path)
+
+
+def state_nbytes(value):
+    # Real memory of the arrays held in a well state, including object columns
+    if isinstance(value, (pd.DataFrame, pd.Series)):
+        return int(np.sum(value.memory_usage(deep=True)))
+    if isinstance(value, np.ndarray):
+        return value.nbytes
+    if isinstance(value, dict):
+        return sum(state_nbytes(item) for item in value.values())
+    if isinstance(value, (list, tuple)):
+        return sum(state_nbytes(item) for item in value)
+
+    return 0
+
+
+class WellCache:
+    """
+    Well states keyed by (session id, well id) with LRU eviction by bytes.
+
+    A state is a plain dict holding the well's frame ("df_las"), its column
+    data, derived curve graph and the other per-well entries of the backend.
+    When the resident states exceed `max_bytes`, the least recently used wells
+    are spilled to parquet under `root` and only their small metadata stays in
+    memory; the next access reads them back. The well being accessed is never
+    evicted, even when it alone exceeds the budget. Parquet is written and read
+    outside `lock`, so spilling one well does not stall the others.
+
+    The "default" well of a session with no upload is read from `fallback_dir`,
+    the single-well layout used before sessions existed.
+
+    A well can adopt a frame file already written elsewhere, such as the
+    project's copy of an upload, instead of writing its own. Each session
+    records the content hashes it uploaded.
+    """
+
+    def __init__(
+        self,
+        root="uploads/sessions",
+        max_bytes=2 * 1024**3,
+        fallback_dir="uploads",
+    ):
+        self.root = root
+        self.max_bytes = max_bytes
+        self.fallback_dir = fallback_dir
+        self.states = OrderedDict()
+        self.sizes = {}
+        self.active = {}
+        self.lock = threading.RLock()
+        self.well_locks = {}
+        self.spilling = set()
+        self.store_locks = {}
+        self.counters = {"hits": 0, "misses": 0, "evictions": 0, "spills": 0}
+
+    def well_dir(self, session_id, well_id):
+        return os.path.join(self.root, safe_id(session_id), safe_id(well_id))
+
+    def activate(self, session_id, well_id):
+        # The well the session's requests use when they do not name one
+        with self.lock:
+            self.active[session_id] = well_id
+
+            session_dir = os.path.join(self.root, safe_id(session_id))
+            os.makedirs(session_dir, exist_ok=True)
+            with open(os.path.join(session_dir, "active_well"), "w") as f:
+                f.write(well_id)
+
+    def active_well(self, session_id):
+        with self.lock:
+            if session_id not in self.active:
+                path = os.path.join(self.root, safe_id(session_id), "active_well")
+                if os.path.exists(path):
+                    with open(path) as f:
+                        self.active[session_id] = f.read().strip()
+
+            return self.active.get(session_id, "default")
+
+    def key(self, session_id, well_id=None):
+        return (session_id, well_id or self.active_well(session_id))
+
+    def lock_for(self, key):
+        # Held by requests that write a well, so they apply one after another
+        with self.lock:
+            return self.well_locks.setdefault(key, threading.RLock())
+
+    def store_lock(self, digest):
+        # Held while a content hash is looked up and stored, so one upload
+        # parses it and the others wait and reuse it
+        with self.lock:
+            return self.store_locks.setdefault(digest, threading.Lock())
+
+    def record_upload(self, session_id, digest):
+        # Content hashes a session has sent the bytes of, kept with its active well
+        with self.lock:
+            if self.uploaded(session_id, digest):
+                return
+
+            session_dir = os.path.join(self.root, safe_id(session_id))
+            os.makedirs(session_dir, exist_ok=True)
+            with open(os.path.join(session_dir, "uploads"), "a") as f:
+                f.write(digest + "\n")
+
+    def uploaded(self, session_id, digest):
+        path = os.path.join(self.root, safe_id(session_id), "uploads")
+        if not os.path.exists(path):
+            return False
+
+        with open(path) as f:
+            return digest in f.read().split()
+
+    def state(self, key):
+        # State dict of a well as it is now, without reading spilled data back
+        with self.lock:
+            return self.states.setdefault(key, {})
+
+    def new(self, session_id, well_id):
+        """Start an empty state for a freshly uploaded well; activate() it once filled."""
+        with self.lock:
+            key = (session_id, well_id)
+            self.states.pop(key, None)
+            self.sizes.pop(key, None)
+            self.states[key] = {}
+
+            return self.states[key]
+
+    def get(self, session_id, well_id=None):
+        """
+        Return the state of a well, reading it back from parquet if spilled.
+
+        Parameters:
+        - session_id: session the well belongs to.
+        - well_id: well to load (defaults to the session's active well).
+
+        Returns:
+        - the well's state dict, without "df_las" if the well has no data yet.
+        """
+        with self.lock:
+            key = self.key(session_id, well_id)
+            state = self.states.setdefault(key, {})
+            resident = "df_las" in state
+
+            if resident:
+                self.counters["hits"] += 1
+                self.states.move_to_end(key)
+
+        if resident:
+            self.shrink(key)
+            return state
+
+        directories = [self.well_dir(*key)]
+        if key[1] == "default":
+            directories.append(self.fallback_dir)
+
+        for directory in directories:
+            frames = self.read(directory)
+            if frames is None:
+                continue
+
+            with self.lock:
+                # Unless the well was saved or started anew while reading
+                if self.states.get(key) is not state or "df_las" in state:
+                    return self.states.get(key, state)
+
+                self.counters["misses"] += 1
+                state["df_las"], state["column_data"] = frames
+
+            self.update(key)
+            break
+
+        return state
+
+    @staticmethod
+    def read(directory):
+        # (df_las, column_data) saved in a directory, or None
+        if not os.path.exists(os.path.join(directory, "column_data.parquet")):
+            return None
+
+        return (
+            pd.read_parquet(os.path.join(directory, "df_las.parquet"), engine="pyarrow"),
+            pd.read_parquet(os.path.join(directory, "column_data.parquet"), engine="pyarrow"),
+        )
+
+    @staticmethod
+    def write(directory, df_las: pd.DataFrame, column_data: pd.DataFrame):
+        # Each file is replaced whole, so readers and links never see a partial
+        # file; column_data goes last and marks the directory complete
+        os.makedirs(directory, exist_ok=True)
+
+        for name, frame in (("df_las", df_las), ("column_data", column_data)):
+            replace_with(
+                os.path.join(directory, f"{name}.parquet"),
+                functools.partial(frame.to_parquet, engine="pyarrow"),
+            )
+
+    def save(self, key, df_las: pd.DataFrame, column_data: pd.DataFrame):
+        # Writes the well's frames to its own directory
+        self.write(self.well_dir(*key), df_las, column_data)
+
+    def adopt(self, key, path, column_data: pd.DataFrame):
+        # Gives a well an existing frame file, hard-linked where possible, and
+        # its column data; column_data goes last and marks the directory complete
+        directory = self.well_dir(*key)
+        os.makedirs(directory, exist_ok=True)
+
+        replace_with(
+            os.path.join(directory, "df_las.parquet"),
+            functools.partial(link_or_copy, path),
+        )
+        replace_with(
+            os.path.join(directory, "column_data.parquet"),
+            functools.partial(column_data.to_parquet, engine="pyarrow"),
+        )
+
+    def update(self, key):
+        """Re-measure a well after its state changed and evict others if over budget."""
+        with self.lock:
+            if key not in self.states:
+                return
+
+            self.states.move_to_end(key)
+            self.sizes[key] = state_nbytes(
+                [self.states[key].get(entry) for entry in RESIDENT_KEYS]
+            )
+
+        self.shrink(key)
+
+    def shrink(self, keep):
+        # Spill least recently used wells, other than `keep`, until under budget;
+        # wells another thread is spilling already count as gone
+        with self.lock:
+            others = [
+                other for other in self.states if other != keep and self.sizes.get(other)
+            ]
+
+        for other in others:
+            with self.lock:
+                resident = sum(
+                    size for key, size in self.sizes.items() if key not in self.spilling
+                )
+                if resident <= self.max_bytes:
+                    return
+                if other in self.spilling:
+                    continue
+                self.spilling.add(other)
+
+            try:
+                self.evict(other)
+            finally:
+                with self.lock:
+                    self.spilling.discard(other)
+
+    def evict(self, key):
+        # The frames are written outside the lock and dropped only if the well
+        # still holds them, so a save meanwhile is never lost
+        with self.lock:
+            state = self.states.get(key)
+            if state is None:
+                return
+            df_las = state.get("df_las")
+            column_data = state.get("column_data")
+
+        if df_las is not None:
+            self.save(key, df_las, column_data)
+
+        with self.lock:
+            if self.states.get(key) is not state or state.get("df_las") is not df_las:
+                return
+
+            if df_las is not None:
+                self.counters["spills"] += 1
+
+            for entry in RESIDENT_KEYS:
+                state.pop(entry, None)
+
+            self.sizes[key] = 0
+            self.counters["evictions"] += 1
+
+    def stats(self):
+        with self.lock:
+            return {
+                **self.counters,
+                "resident_bytes": sum(self.sizes.values()),
+                "max_bytes": self.max_bytes,
+                "resident_wells": sum(1 for size in self.sizes.values() if size),
+                "wells": len(self.states),
+            }
@@ -0,0 +1,89 @@
+import asyncio
+import functools
+import threading
+import contextvars
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+
+
+class WorkerPool:
+    """
+    Executor with a fixed concurrency limit and queue-depth counters.
+
+    `workers` is the number of jobs that run at once; anything submitted beyond
+    that waits in the executor queue and shows up as "queue_depth" in stats().
+    Thread pools run jobs in a copy of the caller's context, so context
+    variables such as the request's session are visible to the job. Process
+    pools need picklable, module-level callables.
+    """
+
+    def __init__(self, name, workers=4, kind="thread"):
+        self.name = name
+        self.kind = kind
+        self.workers = max(int(workers), 1)
+        self.lock = threading.Lock()
+        self.counters = {"in_flight": 0, "max_queue_depth": 0, "completed": 0, "failed": 0}
+
+        if kind == "process":
+            self.executor = ProcessPoolExecutor(max_workers=self.workers)
+        elif kind == "thread":
+            self.executor = ThreadPoolExecutor(
+                max_workers=self.workers, thread_name_prefix=name
+            )
+        else:
+            raise ValueError(f"Unknown pool kind: {kind}")
+
+    def submit(self, fn, *args, **kwargs):
+        if self.kind == "thread":
+            call = functools.partial(contextvars.copy_context().run, fn, *args, **kwargs)
+        else:
+            call = functools.partial(fn, *args, **kwargs)
+
+        with self.lock:
+            self.counters["in_flight"] += 1
+            self.counters["max_queue_depth"] = max(
+                self.counters["max_queue_depth"],
+                self.counters["in_flight"] - self.workers,
+            )
+
+        future = self.executor.submit(call)
+        future.add_done_callback(self.done)
+        return future
+
+    def done(self, future):
+        with self.lock:
+            self.counters["in_flight"] -= 1
+            if future.cancelled() or future.exception() is not None:
+                self.counters["failed"] += 1
+            else:
+                self.counters["completed"] += 1
+
+    async def run(self, fn, *args, **kwargs):
+        # Awaitable from the event loop, which stays free while the job runs
+        return await asyncio.wrap_future(self.submit(fn, *args, **kwargs))
+
+    def call(self, fn, *args, **kwargs):
+        # Blocking form for code already running in another pool's worker
+        return self.submit(fn, *args, **kwargs).result()
+
+    def offload(self, handler):
+        """
+        Decorator running a synchronous FastAPI handler in this pool.
+
+        The wrapper keeps the handler's signature, so FastAPI still sees its
+        Form/File parameters.
+        """
+
+        @functools.wraps(handler)
+        async def endpoint(*args, **kwargs):
+            return await self.run(handler, *args, **kwargs)
+
+        return endpoint
+
+    def stats(self):
+        with self.lock:
+            return {
+                "kind": self.kind,
+                "workers": self.workers,
+                **self.counters,
+                "queue_depth": max(self.counters["in_flight"] - self.workers, 0),
+            }